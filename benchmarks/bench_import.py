@@ -0,0 +1,55 @@
+"""
+Measure time to import lakeweed modules in a new process.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "dateutil", "pytz", "multiprocessing"]
+
+MODULES = [
+    "lakeweed",
+    "lakeweed.clickhouse",
+    "lakeweed.inferencial_parser",
+    "lakeweed.time_parser",
+    "lakeweed.util",
+]
+
+CODE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(elapsed, ' '.join(m for m in {heavy} if m in sys.modules))
+"""
+
+
+def measure(module, repeat):
+    times = []
+    loaded = ""
+    for _ in range(repeat):
+        code = CODE.format(module=module, heavy=HEAVY_MODULES)
+        out = subprocess.run([sys.executable, "-c", code], check=True, cwd=ROOT, stdout=subprocess.PIPE, universal_newlines=True).stdout.split(maxsplit=1)
+        times.append(float(out[0]))
+        loaded = out[1].strip() if len(out) > 1 else ""
+    return {"module": module, "median_sec": statistics.median(times), "min_sec": min(times), "heavy_modules": loaded.split()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        print(json.dumps(measure(module, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare JSON backends for decoding JSON lines and converting them by data_string2type_value.
+
+Usage:
+    python benchmarks/bench_json_backend.py [--rows N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lakeweed import clickhouse, json_backend  # noqa: E402
+
+
+def json_lines(rows):
+    return "\n".join(json.dumps({
+        "id": i,
+        "value": i * 0.5,
+        "flag": i % 2 == 0,
+        "name": f"name-{i}",
+        "nested": {"a": [1, 2, 3], "b": {"c": "hoge"}},
+    }) for i in range(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    src = json_lines(args.rows)
+    lines = src.split("\n")
+
+    for name in [json_backend.Stdlib, json_backend.Orjson]:
+        try:
+            json_backend.set_backend(name)
+        except ImportError:
+            print(json.dumps({"backend": name, "skipped": "not installed"}))
+            continue
+
+        loads = json_backend.loads
+        decode = min(timeit.repeat(lambda: [loads(line) for line in lines], number=1, repeat=args.repeat))
+        convert = min(timeit.repeat(lambda: clickhouse.data_string2type_value(src, format="json_lines"), number=1, repeat=args.repeat))
+        print(json.dumps({"backend": name, "rows": args.rows, "decode_sec": decode, "data_string2type_value_sec": convert}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure memory of parsed datetimes by tracemalloc.
+
+It compares DateTimeWithNS with a dataclass which has __dict__ (the previous layout),
+and keeping / dropping original strings (ColumnTimeParser(keep_original_string=False)).
+
+Usage:
+    python benchmarks/bench_memory.py [--rows N]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payloads  # noqa: E402
+from lakeweed import time_parser  # noqa: E402
+
+
+@dataclass
+class DictDateTimeWithNS:
+    datetime: datetime.datetime
+    nanosec: int
+    original_string: str
+
+
+def peak_bytes(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        (current, peak) = tracemalloc.get_traced_memory()
+        return current, peak, result
+    finally:
+        tracemalloc.stop()
+
+
+def parse_all(strings, wrap=None, keep_original_string=True):
+    parser = time_parser.ColumnTimeParser(keep_original_string)
+    parsed = [parser.parse(s) for s in strings]
+    if wrap is not None:
+        parsed = [wrap(p.datetime, p.nanosec, p.original_string) for p in parsed]
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    time_parser.set_parse_cache(None)  # cache keeps parsed values alive
+
+    # Lazy imports of dateutil and pytz must not be counted in the first case.
+    parse_all(payloads.datetime_strings(10))
+
+    # Strings are freed after parsing, as values of a batch are replaced by parsed values.
+    cases = [
+        ("dict_dataclass", lambda: parse_all(payloads.datetime_strings(args.rows), DictDateTimeWithNS)),
+        ("slots", lambda: parse_all(payloads.datetime_strings(args.rows))),
+        ("slots_without_original_string", lambda: parse_all(payloads.datetime_strings(args.rows), keep_original_string=False)),
+    ]
+    for name, func in cases:
+        (current, peak, result) = peak_bytes(func)
+        print(json.dumps({"case": name, "rows": args.rows, "retained_bytes": current, "peak_bytes": peak,
+                          "retained_bytes_per_datetime": current / args.rows}))
+        del result
+
+    time_parser.set_parse_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Measure each stage of the conversion pipeline with synthetic payloads.
+
+Every result is printed as a JSON line with commit hash and scenario parameters.
+Save results of a commit by --output, then compare other commit with it by --compare.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scenario NAME ...] [--stage NAME ...] [--repeat N] [--scale X]
+                                        [--output results.jsonl] [--compare baseline.jsonl]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import payloads  # noqa: E402
+from lakeweed import clickhouse, inferencial_parser, time_parser, util  # noqa: E402
+
+SCENARIOS = {
+    "baseline": dict(rows=2000, columns=10),
+    "wide": dict(rows=200, columns=200),
+    "nested": dict(rows=2000, columns=10, depth=5),
+    "long_arrays": dict(rows=1000, columns=10, array_length=64),
+    "datetime_heavy": dict(rows=2000, columns=10, datetime_density=0.8),
+    "no_datetime": dict(rows=2000, columns=10, datetime_density=0.0),
+    "sparse": dict(rows=2000, columns=50, sparsity=0.8),
+}
+
+# Stages depend on payload format.
+FORMAT_STAGES = ["inferencial_parse", "data_string2type_value"]
+# Stages measured once for each scenario with records of JSON Lines payload.
+RECORD_STAGES = ["flatten", "data_types", "upcast_data_types", "elastic_time_parse"]
+STAGES = FORMAT_STAGES + RECORD_STAGES
+
+
+def format_stages(src, format):
+    if isinstance(src, list):  # documents of JSON
+        return {
+            "inferencial_parse": lambda: [inferencial_parser.inferencial_parse(s, format=format) for s in src],
+            "data_string2type_value": lambda: [clickhouse.data_string2type_value(s, format=format) for s in src],
+        }
+    return {
+        "inferencial_parse": lambda: inferencial_parser.inferencial_parse(src, format=format),
+        "data_string2type_value": lambda: clickhouse.data_string2type_value(src, format=format),
+    }
+
+
+def record_stages(params):
+    records = payloads.records(**params)
+    src = payloads.json_lines_payload(**params)
+    (_, _, values_list) = inferencial_parser.inferencial_parse(src, format=inferencial_parser.JsonLines)
+    types_list = [util.data_types(values) for values in values_list]
+    datetime_strings = payloads.datetime_strings(params["rows"])
+
+    return {
+        "flatten": lambda: [util.flatten(r, delimiter="__") for r in records],
+        "data_types": lambda: [util.data_types(values) for values in values_list],
+        "upcast_data_types": lambda: util.upcast_data_types(types_list),
+        "elastic_time_parse": lambda: [time_parser.elastic_time_parse(s) for s in datetime_strings],
+    }
+
+
+def measure(func, repeat):
+    func()  # warm up lazy imports
+    # Parse cache of elastic_time_parse is cleared before each run, otherwise the same strings are only looked up.
+    times = timeit.repeat(func, setup=time_parser.clear_parse_cache, number=1, repeat=repeat)
+    return min(times), statistics.median(times)
+
+
+def commit_hash():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result["scenario"], result["format"], result["stage"])
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return {result_key(r): r for r in (json.loads(line) for line in f if line.strip())}
+
+
+def run(scenarios, stages, repeat, scale):
+    commit = commit_hash()
+    for name in scenarios:
+        params = dict(SCENARIOS[name])
+        params["rows"] = max(1, int(params["rows"] * scale))
+
+        targets = []
+        for format, generate in payloads.Generators.items():
+            src = generate(**params)
+            targets.extend((format, stage, func) for stage, func in format_stages(src, format).items())
+        targets.extend(("-", stage, func) for stage, func in record_stages(params).items())
+
+        for format, stage, func in targets:
+            if stage not in stages:
+                continue
+            best, median = measure(func, repeat)
+            yield dict(params, **{
+                "commit": commit,
+                "python": platform.python_version(),
+                "scenario": name,
+                "format": format,
+                "stage": stage,
+                "repeat": repeat,
+                "best_sec": best,
+                "median_sec": median,
+                "rows_per_sec": params["rows"] / best if best > 0 else None,
+            })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS.keys(), default=list(SCENARIOS.keys()))
+    parser.add_argument("--stage", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply rows of every scenario")
+    parser.add_argument("--output", help="append results to this JSON lines file")
+    parser.add_argument("--compare", help="JSON lines file written by --output of baseline commit")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    output = open(args.output, "a") if args.output else None
+    try:
+        for result in run(args.scenario, args.stage, args.repeat, args.scale):
+            line = json.dumps(result)
+            if output:
+                output.write(line + "\n")
+                output.flush()
+
+            base = baseline.get(result_key(result))
+            if base:
+                result["baseline_commit"] = base["commit"]
+                result["baseline_best_sec"] = base["best_sec"]
+                result["ratio"] = result["best_sec"] / base["best_sec"] if base["best_sec"] > 0 else None
+                line = json.dumps(result)
+            print(line)
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
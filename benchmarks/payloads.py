@@ -0,0 +1,115 @@
+"""
+Synthetic payload generators for benchmarks.
+
+Every generator is deterministic for the same arguments and seed, so results are comparable between commits.
+"""
+import csv
+import datetime
+import io
+import json
+import random
+
+Int = "int"
+Float = "float"
+Bool = "bool"
+String = "string"
+DateTime = "datetime"
+Array = "array"
+
+ScalarKinds = [Int, Float, Bool, String]
+BaseTime = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def column_kinds(columns: int, datetime_density=0.2, arrays=True) -> list:
+    """
+    Decide value kind of each column.
+    First `columns * datetime_density` columns are DateTime, and others cycle scalar kinds (and Array if arrays is True).
+    """
+    datetime_columns = int(round(columns * datetime_density))
+    kinds = ScalarKinds + [Array] if arrays else ScalarKinds
+    return [DateTime if c < datetime_columns else kinds[(c - datetime_columns) % len(kinds)] for c in range(columns)]
+
+
+def records(rows=1000, columns=10, depth=0, array_length=3, datetime_density=0.2, sparsity=0.0, seed=0, arrays=True) -> list:
+    """
+    Generate list of dict.
+
+    Keyword Arguments:
+        rows {int} -- number of records
+        columns {int} -- number of leaf values per record
+        depth {int} -- nesting depth of each leaf value. 0 means flat object.
+        array_length {int} -- length of Array values
+        datetime_density {float} -- ratio of DateTime columns in columns
+        sparsity {float} -- probability that a key is omitted in a record
+        seed {int} -- random seed
+        arrays {bool} -- whether Array columns are generated
+    """
+    rnd = random.Random(seed)
+    kinds = column_kinds(columns, datetime_density, arrays)
+    result = []
+    for i in range(rows):
+        record = {}
+        for c, kind in enumerate(kinds):
+            if sparsity > 0 and rnd.random() < sparsity:
+                continue
+            value = __value(kind, i, rnd, array_length)
+            for d in reversed(range(depth)):
+                value = {f"n{d}": value}
+            record[f"c{c}"] = value
+        result.append(record)
+    return result
+
+
+def __value(kind, i, rnd, array_length):
+    if kind == Int:
+        return rnd.randint(-2**31, 2**31)
+    if kind == Float:
+        return rnd.random() * 1000
+    if kind == Bool:
+        return rnd.random() < 0.5
+    if kind == String:
+        return f"str-{rnd.randint(0, 9999)}"
+    if kind == DateTime:
+        return datetime_string(i, rnd)
+    if kind == Array:
+        return [rnd.randint(0, 100) for _ in range(array_length)]
+    raise ValueError(f"Unknown kind {kind}")
+
+
+def datetime_string(i, rnd) -> str:
+    t = BaseTime + datetime.timedelta(seconds=i * 37 + rnd.randint(0, 30), microseconds=rnd.randint(0, 999999))
+    return t.strftime("%Y-%m-%dT%H:%M:%S.%f") + "+09:00"
+
+
+def datetime_strings(count=1000, seed=0) -> list:
+    rnd = random.Random(seed)
+    return [datetime_string(i, rnd) for i in range(count)]
+
+
+def json_payload(**kwargs) -> list:
+    """lakeweed reads a JSON document as one record, so JSON payload is a list of documents like messages of a queue."""
+    return [json.dumps(r) for r in records(**kwargs)]
+
+
+def json_lines_payload(**kwargs) -> str:
+    return "\n".join(json.dumps(r) for r in records(**kwargs))
+
+
+def csv_payload(**kwargs) -> str:
+    """CSV has neither nesting nor Array, so depth and arrays are ignored. Omitted keys are written as empty fields."""
+    kwargs = dict(kwargs, depth=0, arrays=False)
+    columns = kwargs.get("columns", 10)
+    keys = [f"c{c}" for c in range(columns)]
+    with io.StringIO() as out:
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(keys)
+        for r in records(**kwargs):
+            writer.writerow([r.get(k, "") for k in keys])
+        return out.getvalue()
+
+
+Generators = {
+    "json": json_payload,
+    "json_lines": json_lines_payload,
+    "csv": csv_payload,
+}
@@ -0,0 +1,71 @@
+"""
+asyncio API of lakeweed.clickhouse. Conversions run in an executor, so the event loop is not blocked.
+
+Executor is ThreadPoolExecutor of the event loop by default. Conversion holds the GIL, so use ProcessPoolExecutor
+to convert in parallel. With ProcessPoolExecutor, arguments are pickled, so schema_cache, stats and profiler are not updated.
+"""
+import asyncio
+from collections import deque
+from functools import partial
+
+from . import clickhouse
+
+
+async def data_string2type_value(src_str, executor=None, semaphore=None, **kwargs) -> (tuple, tuple, list):
+    """
+    Same as clickhouse.data_string2type_value, but run it in executor.
+
+    Keyword Arguments:
+        executor -- concurrent.futures.Executor to run conversion. If it's None, use default executor of the event loop. (default: {None})
+        semaphore -- asyncio.Semaphore shared by callers to bound number of concurrent conversions. (default: {None})
+        kwargs -- Keyword arguments of clickhouse.data_string2type_value.
+    """
+    loop = asyncio.get_running_loop()
+    func = partial(clickhouse.data_string2type_value, src_str, **kwargs)
+    if semaphore is None:
+        return await loop.run_in_executor(executor, func)
+
+    async with semaphore:
+        return await loop.run_in_executor(executor, func)
+
+
+async def iter_data_string2type_value(messages, in_flight=4, executor=None, **kwargs):
+    """
+    Convert each message of messages in executor, and yield results in the order of messages.
+    At most in_flight messages are converted at the same time, following messages are not read until a result is yielded.
+
+    Arguments:
+        messages -- Iterable or async iterable of src_str of clickhouse.data_string2type_value.
+
+    Keyword Arguments:
+        in_flight -- Number of messages converted at the same time. (default: {4})
+        executor, kwargs -- Same as data_string2type_value.
+
+    Yields:
+        tuple -- (columns, types, values_list) for each message. If conversion raised exception, it's raised when the result is yielded.
+    """
+    if in_flight <= 0:
+        raise ValueError(f"in_flight must be positive: {in_flight}")
+
+    loop = asyncio.get_running_loop()
+    pending = deque()
+    try:
+        async for src_str in __aiter(messages):
+            pending.append(loop.run_in_executor(executor, partial(clickhouse.data_string2type_value, src_str, **kwargs)))
+            if len(pending) >= in_flight:
+                yield await pending.popleft()
+
+        while len(pending) > 0:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def __aiter(messages):
+    if hasattr(messages, "__aiter__"):
+        async for message in messages:
+            yield message
+    else:
+        for message in messages:
+            yield message
@@ -1,22 +1,44 @@
-import json
 import logging
-from collections import OrderedDict
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timezone
+from itertools import repeat
 
-from .time_parser import elastic_time_parse
-from .inferencial_parser import inferencial_parse
-from .util import data_types, upcast_data_types, specified_type2lakeweed_type, get_array_inner_type
+from . import json_backend
+from .time_parser import ColumnTimeParser, DateTimeWithNS, to_epoch
+from .inferencial_parser import Invalid, CsvEnginePandas, inferencial_parse, iter_json_lines, sniff_format, split_chunks, append_union_rows, pad_union_rows
+from .sampling import Sampling
+from .stats import SchemaCacheLookup, DataTypes, Upcast, SpecifiedTypes, UnknownTypes, Conversion
+from .util import data_types, fit_data_types, upcast_data_types, upcast_data_type, specified_type2lakeweed_type, get_array_inner_type, resolve_unknown_data_type
 
 
-def data_string2type_value(src_str: str, specified_types={}, tz_str=None, logger=logging.getLogger("lakeweed__clickhouse")) -> (tuple, tuple, list):
+def data_string2type_value(src_str: str, specified_types={}, tz_str=None, logger=logging.getLogger("lakeweed__clickhouse"), format=None, columnar=False, schema_cache=None, sampling=None, csv_engine=CsvEnginePandas,
+                           stats=None, profiler=None, datetime_precision=None) -> (tuple, tuple, list):
     """
     Convert string to python dict with data types for Clickhouse
 
     Arguments:
-        src_str {str} -- Json, JsonLines, or CSV string.
+        src_str {str|bytes-like} -- Json, JsonLines, or CSV string. bytes, bytearray, memoryview, and mmap are read as UTF-8 without decoding whole src.
 
     Keyword Arguments:
         logger -- logger object (default: {logging.getLogger("lakeweed__clickhouse")})
         tz_str -- timezone string on tz database. https://www.wikiwand.com/en/List_of_tz_database_time_zones If it's not provided use UTC(no offset).
+        format -- "json", "json_lines", or "csv". If it's provided, skip format inference. (default: {None})
+        columnar -- If it's True, return values as list of numpy masked arrays for each column instead of values_list.
+                    Integer columns having values out of int64 range are object arrays. (default: {False})
+                    Float64, Int64, UInt8 columns are float64, int64, uint8 arrays, DateTime64(6) column is datetime64[us] array in UTC,
+                    and other columns are object arrays. None values are masked.
+        schema_cache -- lakeweed.schema.SchemaCache. If it's provided, types of records which have the same columns are reused
+                        while all values fit the cached types, and type inference is skipped. (default: {None})
+        sampling -- lakeweed.sampling.Sampling or number of head records. If it's provided, types are inferred with sampled records,
+                    and inferred again with records which do not fit the types. (default: {None})
+        csv_engine -- "pandas" or "stdlib". "stdlib" parses CSV by csv module, it's faster for small and medium CSV. (default: {"pandas"})
+        stats -- lakeweed.stats.PipelineStats to record wall time, rows and columns of each stage. (default: {None})
+        profiler -- lakeweed.profiler.ColumnProfiler to attribute cost of type inference and conversion to each column. (default: {None})
+        datetime_precision -- 0 to 9. If it's provided, DateTime values are int epoch time in 10^-datetime_precision seconds
+                              and type is DateTime64(datetime_precision), instead of datetime. e.g. 9 keeps nanosec part of values.
+                              Values which match the learned layout are converted without datetime object.
+                              In columnar, they are int64 arrays, or object arrays if values are out of int64 range. (default: {None})
 
     Returns:
         tuple -- return tuple (columns, types, values_list).
@@ -31,114 +53,477 @@ def data_string2type_value(src_str: str, specified_types={}, tz_str=None, logger
                            Order of inside list values correspond to a columns order. In JsonLines, if there is not key in some record, will be set None value.
     """
 
-    (format, src_keys, src_values_list) = inferencial_parse(src_str, specified_types, "__", logger)
+    (format, src_keys, src_values_list) = inferencial_parse(src_str, specified_types, "__", logger, format=format, csv_engine=csv_engine, stats=stats)
+    return __type_values(src_keys, src_values_list, specified_types, tz_str, columnar, schema_cache, sampling, stats, profiler, datetime_precision)
 
+
+def iter_data_lines2type_value(src_lines, batch_size=10000, specified_types={}, tz_str=None, logger=logging.getLogger("lakeweed__clickhouse"), columnar=False, schema_cache=None, sampling=None,
+                               stats=None, profiler=None, datetime_precision=None):
+    """
+    Convert JsonLines to python values with data types for Clickhouse batch by batch.
+    Only one batch is kept in memory, so it can be used for large files.
+
+    Arguments:
+        src_lines -- Iterable of JsonLines string or bytes. e.g. file object opened by open().
+
+    Keyword Arguments:
+        batch_size -- Maximum number of records in a batch. (default: {10000})
+        tz_str, columnar, schema_cache, sampling, stats, profiler, datetime_precision -- Same as data_string2type_value. Stages of type conversion are recorded for each batch.
+
+    Yields:
+        tuple -- (columns, types, values_list) for each batch. Same as data_string2type_value.
+                 Types are estimated in each batch, so they may be different between batches.
+    """
+    for src_keys, src_values_list in iter_json_lines(src_lines, "__", batch_size, logger):
+        yield __type_values(src_keys, src_values_list, specified_types, tz_str, columnar, schema_cache, sampling, stats, profiler, datetime_precision)
+
+
+def batch_data_string2type_value(src_list, specified_types={}, tz_str=None, logger=logging.getLogger("lakeweed__clickhouse"), format=None, columnar=False,
+                                 schema_cache=None, sampling=None, csv_engine=CsvEnginePandas, stats=None, profiler=None, datetime_precision=None) -> (tuple, tuple, list):
+    """
+    Convert many messages into one result with the same columns and types, e.g. to insert them as a block.
+    Columns are union set of keys of all messages, and types are inferred and upcasted once for all records.
+
+    Arguments:
+        src_list -- Iterable of src_str of data_string2type_value. Each message may have different format.
+                    Messages which are not Json, JsonLines, or CSV are skipped with warning.
+
+    Keyword Arguments:
+        format -- Format of all messages. If it's provided, skip format inference for each message. (default: {None})
+        Others -- Same as data_string2type_value.
+
+    Returns:
+        tuple -- (columns, types, values_list) same as data_string2type_value. Records are in the order of messages.
+    """
+    key_indices = {}  # union set of keys -> column index
+    rows = []
+    for idx, src_str in enumerate(src_list):
+        (src_format, keys, values_list) = inferencial_parse(src_str, specified_types, "__", logger, format=format, csv_engine=csv_engine, stats=stats)
+        if src_format == Invalid:
+            logger.warning(f"Skip message is not Json, JsonLines, or CSV at {idx}")
+            continue
+        append_union_rows(keys, values_list, key_indices, rows)
+
+    columns = []
+    values_list = []
+    pad_union_rows(key_indices, rows, columns, values_list)
+    return __type_values(columns, values_list, specified_types, tz_str, columnar, schema_cache, sampling, stats, profiler, datetime_precision)
+
+
+def parallel_data_string2type_value(src_str: str, specified_types={}, tz_str=None, logger=logging.getLogger("lakeweed__clickhouse"), format=None, columnar=False,
+                                    workers=None, chunk_size=10000, executor=None, csv_engine=CsvEnginePandas, datetime_precision=None) -> (tuple, tuple, list):
+    """
+    Same as data_string2type_value, but JsonLines and CSV records are processed by chunks in parallel processes.
+    Types of each chunk are inferred in parallel and upcasted, then chunks are converted in parallel.
+    Values are returned in the original order of records.
+
+    Keyword Arguments:
+        workers -- Number of worker processes. If it's None, use number of processors. (default: {None})
+        chunk_size -- Number of records in a chunk. (default: {10000})
+        executor -- concurrent.futures.Executor to reuse worker processes. If it's provided, workers is ignored. (default: {None})
+        columnar -- Same as data_string2type_value. numpy arrays are returned from workers without pickling each records.
+        csv_engine, datetime_precision -- Same as data_string2type_value.
+
+    Note:
+        CSV is parsed for each chunk, so values in a column may be parsed as different types from parsing whole CSV.
+    """
+    chunk_format = sniff_format(src_str) if format is None else format
+    chunks = split_chunks(src_str, chunk_format, chunk_size)
+    if len(chunks) <= 1:
+        return data_string2type_value(src_str, specified_types, tz_str, logger, format=format, columnar=columnar, csv_engine=csv_engine, datetime_precision=datetime_precision)
+
+    own_executor = executor is None
+    if own_executor:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    try:
+        # 1-2. Infer and upcast types for each chunk, then upcast them
+        chunk_types = list(executor.map(__infer_chunk, chunks, repeat(chunk_format), repeat(csv_engine)))
+        if None in chunk_types:
+            logger.debug(f"Chunks are not {chunk_format}, so convert without parallel.")
+            return data_string2type_value(src_str, specified_types, tz_str, logger, format=format, columnar=columnar, csv_engine=csv_engine, datetime_precision=datetime_precision)
+
+        upcasted_types = OrderedDict()
+        for keys, types in chunk_types:
+            for k, t in zip(keys, types):
+                upcasted_types[k] = upcast_data_type(upcasted_types[k], t) if k in upcasted_types else t
+
+        # 3-4.
+        src_keys = list(upcasted_types.keys())
+        schema = __schema_from_types(src_keys, list(upcasted_types.values()), specified_types)
+
+        # 5.
+        results = list(executor.map(__convert_chunk, chunks, repeat(chunk_format), repeat(csv_engine), repeat(src_keys), repeat(schema), repeat(tz_str), repeat(columnar),
+                                    repeat(datetime_precision)))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    (columns, types, values) = results[0]
+    if columnar:
+        import numpy as np
+        values = [np.ma.concatenate([r[2][idx] for r in results]) for idx in range(len(columns))]
+    else:
+        values = [v for r in results for v in r[2]]
+
+    return (columns, types, values)
+
+
+def __infer_chunk(chunk, format, csv_engine) -> (list, list):
+    (format, keys, values_list) = inferencial_parse(chunk, format=format, csv_engine=csv_engine)
+    if format == Invalid:
+        return None
+
+    time_parsers = [ColumnTimeParser() for _ in keys]
+    return keys, upcast_data_types([data_types(values, time_parsers) for values in values_list])
+
+
+def __convert_chunk(chunk, format, csv_engine, src_keys, schema, tz_str, columnar, datetime_precision) -> (tuple, tuple, list):
+    (format, keys, values_list) = inferencial_parse(chunk, format=format, csv_engine=csv_engine)
+
+    # Reorder values to columns of all chunks
+    index = {k: i for i, k in enumerate(keys)}
+    positions = [index.get(k) for k in src_keys]
+    src_values_list = [[None if i is None else values[i] for i in positions] for values in values_list]
+
+    time_parsers = [ColumnTimeParser() for _ in src_keys]
+    parsed_datetimes_list = [{} for _ in src_values_list]
+    return __type_values_with_schema(schema, src_values_list, time_parsers, parsed_datetimes_list, tz_str, columnar, datetime_precision=datetime_precision)
+
+
+def data_type2clickhouse_type(data_type: str, datetime_precision=None) -> str:
+    """
+    Return Clickhouse type of lakeweed type or specified type. e.g. 'Float' -> 'Float64', 'Array(DateTime)' -> 'Array(DateTime64(6))'
+    It can be used with lakeweed.schema.SchemaTracker to make DDL.
+    If datetime_precision is provided, DateTime is DateTime64(datetime_precision) same as data_string2type_value.
+    """
+    ch_type, converter = __compile_converter(resolve_unknown_data_type(data_type), None, ColumnTimeParser(), datetime_precision)
+    return ch_type
+
+
+def __type_values(src_keys, src_values_list, specified_types, tz_str, columnar=False, schema_cache=None, sampling=None, stats=None, profiler=None,
+                  datetime_precision=None) -> (tuple, tuple, list):
+    time_parsers = [ColumnTimeParser() for _ in src_keys] if profiler is None else profiler.time_parsers(src_keys)
+    parsed_datetimes_list = [{} for _ in src_values_list]
+
+    # 1-4. Use cached schema if all values fit it, otherwise infer it.
+    schema = None
+    if schema_cache is not None:
+        start = None if stats is None else time.perf_counter()
+        schema_key = schema_cache.fingerprint(src_keys, specified_types)
+        schema = schema_cache.get(schema_key)
+        if schema is not None and not __fit_schema(schema, src_values_list, time_parsers, tz_str, parsed_datetimes_list):
+            schema_cache.mismatch(schema_key)
+            schema = None
+        if stats is not None:
+            stats.record(SchemaCacheLookup, time.perf_counter() - start, len(src_values_list), len(src_keys))
+
+    if schema is None:
+        if sampling is not None:
+            if isinstance(sampling, int):
+                sampling = Sampling(sampling)
+            schema = __infer_sampled_schema(sampling, src_keys, src_values_list, specified_types, tz_str, time_parsers, parsed_datetimes_list, stats, profiler)
+        if schema is None:
+            schema = __infer_schema(src_keys, src_values_list, specified_types, tz_str, time_parsers, parsed_datetimes_list, stats, profiler)
+        # Sampled schema also fits all values, so it's cached as well.
+        if schema_cache is not None:
+            schema_cache.put(schema_key, schema)
+
+    return __type_values_with_schema(schema, src_values_list, time_parsers, parsed_datetimes_list, tz_str, columnar, stats, profiler, datetime_precision)
+
+
+def __type_values_with_schema(schema, src_values_list, time_parsers, parsed_datetimes_list, tz_str, columnar, stats=None, profiler=None,
+                              datetime_precision=None) -> (tuple, tuple, list):
+    column_types = schema.column_types
+
+    # 3-2. Append missing specified columns with None value
+    for missing_column in schema.missing_columns:
+        time_parsers.append(ColumnTimeParser())
+
+        for values in src_values_list:
+            values.append(None)
+
+    # 5. [Depends on DBMS] Converting values according to the type and add columns if necessary
+    start = None if stats is None else time.perf_counter()
+    if columnar:
+        result = __type_columns(column_types, src_values_list, parsed_datetimes_list, time_parsers, tz_str, profiler, datetime_precision)
+    else:
+        result = __type_rows(column_types, src_values_list, parsed_datetimes_list, time_parsers, tz_str, profiler, datetime_precision)
+    if stats is not None:
+        stats.record(Conversion, time.perf_counter() - start, len(src_values_list), len(column_types))
+    return result
+
+
+def __type_rows(column_types, src_values_list, parsed_datetimes_list, time_parsers, tz_str, profiler=None, datetime_precision=None) -> (tuple, tuple, list):
+    if len(src_values_list) <= 0:
+        return ((), (), [])
+
+    (ch_types, converters, datetime_indices) = __compile_converters(column_types, time_parsers, tz_str, datetime_precision)
+    if profiler is not None:
+        converters = profiler.converters(column_types.keys(), converters)
+
+    ch_values_list = []
+    for values, parsed_datetimes in zip(src_values_list, parsed_datetimes_list):
+        __replace_parsed_datetimes(values, parsed_datetimes, datetime_indices)
+        ch_values_list.append(tuple([convert(v) for convert, v in zip(converters, values)]))
+
+    return (tuple(column_types.keys()), ch_types, ch_values_list)
+
+
+Schema = namedtuple("Schema", ["fit_types", "column_types", "missing_columns"])
+
+
+def __fit_schema(schema, src_values_list, time_parsers, tz_str, parsed_datetimes_list) -> bool:
+    for values, parsed in zip(src_values_list, parsed_datetimes_list):
+        if not fit_data_types(values, schema.fit_types, time_parsers, tz_str, parsed):
+            return False
+    return True
+
+
+def __infer_sampled_schema(sampling, src_keys, src_values_list, specified_types, tz_str, time_parsers, parsed_datetimes_list, stats=None, profiler=None) -> Schema:
+    sampled = set(sampling.indices(len(src_values_list)))
+    sampled_values_list = [src_values_list[i] for i in sorted(sampled)]
+    sampled_parsed_list = [parsed_datetimes_list[i] for i in sorted(sampled)]
+    schema = __infer_schema(src_keys, sampled_values_list, specified_types, tz_str, time_parsers, sampled_parsed_list, stats, profiler)
+
+    # Values which do not fit sampled types are inferred again with sampled values.
+    unfit_values_list = []
+    unfit_parsed_list = []
+    for idx, (values, parsed) in enumerate(zip(src_values_list, parsed_datetimes_list)):
+        if idx in sampled or fit_data_types(values, schema.fit_types, time_parsers, tz_str, parsed):
+            continue
+        if len(unfit_values_list) >= sampling.max_reinference:
+            return None  # infer with all values
+        unfit_values_list.append(values)
+        unfit_parsed_list.append(parsed)
+
+    if len(unfit_values_list) <= 0:
+        return schema
+
+    # Upcasting is monotonic, so values which fit sampled types also fit new types.
+    return __infer_schema(src_keys, sampled_values_list + unfit_values_list, specified_types, tz_str, time_parsers, sampled_parsed_list + unfit_parsed_list, stats, profiler)
+
+
+def __infer_schema(src_keys, src_values_list, specified_types, tz_str, time_parsers, parsed_datetimes_list, stats=None, profiler=None) -> Schema:
     # 1. Mapping type of value in src_values_list to lakeweed supporeted types.
-    src_types_list = [data_types(values) for values in src_values_list]
+    #    Datetime layout is learned for each column, and parsed datetimes are kept to reuse in conversion.
+    start = None if stats is None else time.perf_counter()
+    if profiler is None:
+        src_types_list = [data_types(values, time_parsers, tz_str, parsed) for values, parsed in zip(src_values_list, parsed_datetimes_list)]
+    else:
+        src_types_list = profiler.data_types(src_keys, src_values_list, time_parsers, tz_str, parsed_datetimes_list)
 
     # 2. Upcasting types
+    if stats is not None:
+        upcast_start = time.perf_counter()
+        stats.record(DataTypes, upcast_start - start, len(src_values_list), len(src_keys))
     upcasted_types = upcast_data_types(src_types_list)
+    if stats is not None:
+        stats.record(Upcast, time.perf_counter() - upcast_start, len(src_values_list), len(src_keys))
+
+    return __schema_from_types(src_keys, upcasted_types, specified_types, stats)
+
 
+def __schema_from_types(src_keys, upcasted_types, specified_types, stats=None) -> Schema:
     # 3. Overwrite by specified_types if exists
+    start = None if stats is None else time.perf_counter()
     column_types = OrderedDict()
     for c, t in zip(src_keys, upcasted_types):
         column_types[c] = t
 
+    # Specified columns are not validated with cached schema.
+    fit_types = ['String' if c in specified_types else t for c, t in column_types.items()]
+
     for k, t in specified_types.items():
         if k not in column_types:
             continue
         column_types[k] = specified_type2lakeweed_type(t)
 
-    # 3-2. Append missing specified columns with None value
-    missing_columns = specified_types.keys() - column_types.keys()
+    # 3-2. Append missing specified columns
+    missing_columns = list(specified_types.keys() - column_types.keys())
     for missing_column in missing_columns:
         specified_type = specified_types[missing_column]
         column_types[missing_column] = specified_type
 
-        for values in src_values_list:
-            values.append(None)
-
-
     # 4. [Depends on DBMS] If the type could not be estimated, it should be a String because there is no information to estimate it
+    if stats is not None:
+        unknown_start = time.perf_counter()
+        stats.record(SpecifiedTypes, unknown_start - start, 0, len(column_types))
     for c, t in column_types.items():
-        if t is None:
-            column_types[c] = 'String'
-            continue
-        inner_type = get_array_inner_type(t)
-        if inner_type == 'Empty':
-            column_types[c] = 'Array(String)'
-        if inner_type == 'None':
-            column_types[c] = 'Array(String)'
-
-
-    # 5. [Depends on DBMS] Converting values according to the type and add columns if necessary
-    ch_values_list = []
-    ch_column_types = OrderedDict()
-    for values in src_values_list:
-        ch_values = []
-        for c, t, v in zip(column_types.keys(), column_types.values(), values):
-            ch_c, ch_t, ch_v = __data_value_specified(c, v, t, tz_str)
-            ch_column_types[ch_c] = ch_t
-            ch_values.append(ch_v)
-        ch_values_list.append(tuple(ch_values))
+        column_types[c] = resolve_unknown_data_type(t)
+    if stats is not None:
+        stats.record(UnknownTypes, time.perf_counter() - unknown_start, 0, len(column_types))
+
+    return Schema(fit_types, column_types, missing_columns)
+
+
+__NumpyTypes = {
+    "Float64": "float64",
+    "Int64": "int64",
+    "UInt8": "uint8",
+    "DateTime64(6)": "datetime64[us]",
+}
+
+
+def __type_columns(column_types, src_values_list, parsed_datetimes_list, time_parsers, tz_str, profiler=None, datetime_precision=None) -> (tuple, tuple, list):
+    import numpy as np
+
+    (ch_types, converters, datetime_indices) = __compile_converters(column_types, time_parsers, tz_str, datetime_precision)
+    if profiler is not None:
+        converters = profiler.converters(column_types.keys(), converters)
+
+    # Epoch time values are int64
+    numpy_types = __NumpyTypes if datetime_precision is None else dict(__NumpyTypes, **{f"DateTime64({datetime_precision})": "int64"})
+    row_count = len(src_values_list)
+    arrays = [np.empty(row_count, dtype=numpy_types.get(ch_t, object)) for ch_t in ch_types]
+    masks = [np.zeros(row_count, dtype=bool) for ch_t in ch_types]
+    to_utc = [datetime_precision is None and ch_t == "DateTime64(6)" for ch_t in ch_types]
+
+    for row, (values, parsed_datetimes) in enumerate(zip(src_values_list, parsed_datetimes_list)):
+        __replace_parsed_datetimes(values, parsed_datetimes, datetime_indices)
+        for idx, (convert, v) in enumerate(zip(converters, values)):
+            ch_v = convert(v)
+            if ch_v is None:
+                masks[idx][row] = True
+                continue
+            if to_utc[idx]:
+                ch_v = ch_v.astimezone(timezone.utc).replace(tzinfo=None)
+            try:
+                arrays[idx][row] = ch_v
+            except OverflowError:
+                # Out of int64 range (e.g. UInt64 values, epoch nanoseconds after 2262), keep Python values of the column.
+                arrays[idx] = arrays[idx].astype(object)
+                arrays[idx][row] = ch_v
+
+    columns = [np.ma.MaskedArray(a, mask=m) for a, m in zip(arrays, masks)]
+    return (tuple(column_types.keys()), ch_types, columns)
+
+
+def __replace_parsed_datetimes(values, parsed_datetimes, datetime_indices):
+    # Datetime converters accept DateTimeWithNS parsed in type inference instead of string.
+    for idx, parsed in parsed_datetimes.items():
+        if idx in datetime_indices:
+            values[idx] = parsed
+
+
+def __compile_converters(column_types, time_parsers, tz_str, datetime_precision=None) -> (tuple, tuple, frozenset):
+    """
+    Compile converters of columns once per batch.
 
-    columns_res = tuple(ch_column_types.keys())
-    types_res = tuple(ch_column_types.values())
+    Returns:
+        tuple -- (Clickhouse types, converters, indices of DateTime columns)
+    """
+    ch_types = []
+    converters = []
+    datetime_indices = set()
+    for idx, (t, p) in enumerate(zip(column_types.values(), time_parsers)):
+        ch_t, converter = __compile_converter(t, tz_str, p, datetime_precision)
+        ch_types.append(ch_t)
+        converters.append(converter)
+        if str(t).upper() == 'DATETIME':
+            datetime_indices.add(idx)
 
-    return (columns_res, types_res, ch_values_list)
+    return (tuple(ch_types), tuple(converters), frozenset(datetime_indices))
 
 
-def __data_value_specified(column, value, specified_type, tz_str, depth=0) -> tuple:
+def __compile_converter(specified_type, tz_str, time_parser, datetime_precision=None, depth=0) -> (str, object):
     t = str(specified_type).upper()
 
     if t.startswith("ARRAY"):
-        return __list_data_value_specified(column, value, specified_type, tz_str, depth)
+        return __compile_list_converter(specified_type, tz_str, time_parser, datetime_precision, depth)
 
     if t in ["FLOAT"]:
-        v = convert_or_default(lambda: float(value), None)
-        return (column, "Float64", v)
+        return ("Float64", __to_float)
     if t in ["INT"]:
-        v = convert_or_default(lambda: int(value), None)
-        return (column, "Int64", v)
+        return ("Int64", __to_int)
     if t in ['BOOL']:
-        v = convert_or_default(lambda: 1 if bool(value) else 0, None)
-        if value is None:
-            v = None
-        return (column, "UInt8", v)
+        return ("UInt8", __to_bool)
+    if t == 'DATETIME' and datetime_precision is not None:
+        return __compile_epoch_converter(tz_str, time_parser, datetime_precision)
     if t == 'DATETIME':
-        dt, ns = convert_or_default(lambda: elastic_time_parse(str(value), tz_str=tz_str).tupple(), (None, None))
-
-        return (column, "DateTime64(6)", dt)
+        def to_datetime(value):
+            if type(value) is DateTimeWithNS:
+                return value.datetime
+            try:
+                return time_parser.parse(str(value), tz_str=tz_str).datetime
+            except (TypeError, ValueError):
+                return None
+        return ("DateTime64(6)", to_datetime)
     if t in ['STRING', 'STR']:
-        if isinstance(value, (list, dict, bool)):
-            value = convert_or_default(lambda: json.dumps(value), None)
-        v = convert_or_default(lambda: None if value is None else str(value), None)
-        return (column, "String", v)
+        return ("String", __to_string)
     # Todo need verify spec file method.
     logging.warning(f"Specified type '{str(specified_type)}' is not supported.")
-    return (column, None, value)
+    return (None, __as_is)
+
 
+def __compile_epoch_converter(tz_str, time_parser, precision) -> (str, object):
+    if type(precision) is not int or not 0 <= precision <= 9:
+        raise ValueError(f"datetime_precision must be 0 to 9: {precision}")
 
-def __list_data_value_specified(column, list_value, specified_type, tz_str, depth) -> list:  # [(column, "Array(Type)", value), ]
+    def to_epoch_time(value):
+        if type(value) is DateTimeWithNS:
+            return to_epoch(value, precision)
+        try:
+            return time_parser.parse_epoch(str(value), tz_str, precision)
+        except (TypeError, ValueError):
+            return None
+    return (f"DateTime64({precision})", to_epoch_time)
 
+
+def __compile_list_converter(specified_type, tz_str, time_parser, datetime_precision, depth) -> (str, object):
     if depth > 0:
-        json_str = convert_or_default(lambda: json.dumps(list_value), None)
-        return (column, f"String", json_str)
+        return ("String", __to_json)
 
     inner_type = get_array_inner_type(specified_type)
+    values_type, inner_converter = __compile_converter(inner_type, tz_str, time_parser, datetime_precision, depth + 1)
+
+    def to_list(list_value):
+        if list_value is None or not isinstance(list_value, (list)):
+            return []
+        return [inner_converter(v) for v in list_value]
+
+    return (f"Array({values_type})", to_list)
 
-    values = []
-    dummy, values_type, dummy = __data_value_specified("dummy", None, inner_type, tz_str, depth + 1)
 
-    if list_value is None or not isinstance(list_value, (list)):
-        return (column, f"Array({values_type})", [])
+def __to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def __to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def __to_bool(value):
+    if value is None:
+        return None
+    return 1 if bool(value) else 0
+
+
+def __to_json(value):
+    try:
+        return json_backend.dumps(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def __to_string(value):
+    if isinstance(value, (list, dict, bool)):
+        value = __to_json(value)
+    try:
+        return None if value is None else str(value)
+    except (TypeError, ValueError):
+        return None
 
-    for v in list_value:
-        col, typ, val = __data_value_specified("dummy", v, inner_type, tz_str, depth + 1)
-        values.append(val)
-        values_type = typ
 
-    return (column, f"Array({values_type})", values)
+def __as_is(value):
+    return value
 
 
 def convert_or_default(value_lambda, default):
@@ -1,21 +1,123 @@
+import csv
+import io
 import json
 import logging
-import collections
-import pandas as pd
 import math
+import re
+import time
 
 from io import StringIO
-from . import util
+from . import json_backend, util
+from .stats import Detect
 
 Invalid: str = "invalid"
 Json: str = "json"             # Json single obuject
 JsonLines: str = "json_lines"  # Json lines (list of json object)
 Csv: str = "csv"               # CSV with header
 
+CsvEnginePandas: str = "pandas"  # pandas.read_csv
+CsvEngineStdlib: str = "stdlib"  # csv module, it's faster for small and medium CSV
 
-def inferencial_parse(src: str, specified_types=None, json_delimiter="__", logger=logging.getLogger("lakeweed__format_inferencer")) -> (str, list, list):
+NonSpacePattern = re.compile(r"\S")
+NonSpaceBytesPattern = re.compile(rb"\S")
+MultiTokenPattern = re.compile(r"\S\s+\S")
+MultiTokenBytesPattern = re.compile(rb"\S\s+\S")
+NewlinePattern = re.compile(r"\n")
+NewlineBytesPattern = re.compile(rb"\n")
+
+
+def sniff_format(src) -> str:
+    """
+    Guess format of src string from the first non-whitespace character and the first line.
+    This method does not parse whole src, so the result should be verified by parsing.
+
+    Arguments:
+        src -- str or bytes-like object (bytes, bytearray, memoryview, mmap) encoded by UTF-8.
+
+    Returns:
+        str -- Json, JsonLines, or Csv. If src is empty, will return Invalid.
+    """
+    is_str = isinstance(src, str)
+    non_space = NonSpacePattern if is_str else NonSpaceBytesPattern
+    newline = NewlinePattern if is_str else NewlineBytesPattern
+
+    m = non_space.search(src)
+    if m is None:
+        return Invalid
+
+    head = m.start()
+    head_char = __decode(src[head:head + 1])
+    if head_char == '[':
+        return Json
+    if head_char != '{':
+        return Csv
+
+    # JsonLines has complete JSON object at the first line and some following lines.
+    m = newline.search(src, head)
+    if m is None:
+        return Json
+    line_end = m.start()
+    if not __decode(src[head:line_end]).rstrip().endswith('}'):
+        return Json
+    if non_space.search(src, line_end) is None:
+        return Json
+    return JsonLines
+
+
+def __decode(src) -> str:
+    if isinstance(src, str):
+        return src
+    return bytes(src).decode('utf-8', errors='replace')
+
+
+def __iter_lines(src, keepends=False):
+    """Iterate lines of str or bytes-like object without copying whole src. Lines of bytes-like object are bytes."""
+    newline = NewlinePattern if isinstance(src, str) else NewlineBytesPattern
+    size = len(src)
+    pos = 0
+    while pos < size:
+        m = newline.search(src, pos)
+        end = size if m is None else m.end()
+        line = src[pos:end if keepends or m is None else m.start()]
+        yield line.tobytes() if isinstance(line, memoryview) else line
+        pos = end
+
+
+class __BufferReader(io.RawIOBase):
+    """Readable file object of bytes-like object without copying whole buffer."""
+
+    def __init__(self, buffer):
+        self.__buffer = memoryview(buffer).cast('B')
+        self.__pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self.__buffer) - self.__pos)
+        b[:n] = self.__buffer[self.__pos:self.__pos + n]
+        self.__pos += n
+        return n
+
+    def close(self):
+        self.__buffer.release()
+        super().close()
+
+
+def inferencial_parse(src: str, specified_types=None, json_delimiter="__", logger=logging.getLogger("lakeweed__format_inferencer"), format=None, csv_engine=CsvEnginePandas,
+                      stats=None) -> (str, list, list):
     """
     This method try to parse src string as Json, JsonLines, or Csv  with inference.
+    The format guessed by sniff_format is tried first, and others are tried if it is failed.
+
+    Arguments:
+        src -- str or bytes-like object (bytes, bytearray, memoryview, mmap) encoded by UTF-8.
+               JsonLines and CSV in bytes-like object are decoded line by line without copying whole src.
+
+    Keyword Arguments:
+        format -- Json, JsonLines, or Csv. If it's provided, src is parsed only as the format without inference.
+        csv_engine -- CsvEnginePandas or CsvEngineStdlib to parse CSV. (default: {CsvEnginePandas})
+        stats -- lakeweed.stats.PipelineStats to record each detection attempt as "detect:<format>". (default: {None})
 
     Returns:
         tuple -- return (Foramt, Keys, Record List).
@@ -30,94 +132,236 @@ def inferencial_parse(src: str, specified_types=None, json_delimiter="__", logge
     if specified_types is None:
         specified_types = {}
 
-    keys = []
-    values_list = []
+    parsers = {
+        Json: lambda keys, values_list: __is_json(src, json_delimiter, specified_types, logger, keys, values_list),
+        # A single record is also Json Lines if the format is provided, otherwise it's not distinguishable from Json.
+        JsonLines: lambda keys, values_list: __is_multi_jsons(src, json_delimiter, specified_types, logger, keys, values_list, 2 if format is None else 1),
+        Csv: lambda keys, values_list: __is_csv(src, specified_types, logger, keys, values_list),
+    }
+    if csv_engine == CsvEngineStdlib:
+        parsers[Csv] = lambda keys, values_list: __is_csv_stdlib(src, specified_types, logger, keys, values_list)
+    elif csv_engine != CsvEnginePandas:
+        raise ValueError(f"CSV engine '{csv_engine}' is not supported.")
+
+    if format is not None:
+        if format not in parsers:
+            raise ValueError(f"Format '{format}' is not supported.")
+        candidates = [format]
+    else:
+        # Json (single object), Json Lines, CSV with header. The sniffed format is tried first.
+        candidates = [Json, JsonLines, Csv]
+        sniffed = sniff_format(src)
+        if sniffed == Invalid:
+            return Invalid, [], []
+        candidates.remove(sniffed)
+        candidates.insert(0, sniffed)
+
+    for candidate in candidates:
+        keys = []
+        values_list = []
+        if stats is None:
+            parsed = parsers[candidate](keys, values_list)
+        else:
+            start = time.perf_counter()
+            parsed = parsers[candidate](keys, values_list)
+            (rows, columns) = (len(values_list), len(keys)) if parsed else (0, 0)
+            stats.record(f"{Detect}:{candidate}", time.perf_counter() - start, rows, columns)
+        if parsed:
+            return candidate, keys, values_list
+
+    return Invalid, [], []
 
-    # Json (single object)
-    if __is_json(src, json_delimiter, specified_types, logger, keys, values_list):
-        return Json, keys, values_list
 
-    # Json Lines
-    if __is_multi_jsons(src, json_delimiter, specified_types, logger, keys, values_list):
-        return JsonLines, keys, values_list
+def split_chunks(src: str, format: str, chunk_size: int) -> list:
+    """
+    Split JsonLines or CSV string into strings which have chunk_size records at most.
+    Each CSV chunk starts with the header line. Lines in a quoted CSV field are kept in the same chunk.
 
-    # CSV with header
-    if __is_csv(src, specified_types, logger, keys, values_list):
-        return Csv, keys, values_list
+    Returns:
+        list -- List of string chunks. If format is not JsonLines or Csv, will return [src].
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive: {chunk_size}")
+    if format not in (JsonLines, Csv):
+        return [src]
+
+    lines = src.strip().split('\n')
+    header = []
+    if format == Csv:
+        header = lines[0:1]
+        lines = lines[1:]
+
+    chunks = []
+    records = []
+    record_count = 0
+    quotes = 0
+    for line in lines:
+        if quotes % 2 == 0 and not line.strip():
+            continue  # blank line
+        records.append(line)
+        if format == Csv:
+            quotes += line.count('"')
+            if quotes % 2 != 0:
+                continue  # quoted field continues to next line
+        record_count += 1
+        if record_count >= chunk_size:
+            chunks.append('\n'.join(header + records))
+            records = []
+            record_count = 0
 
-    return Invalid, [], []
+    if len(records) > 0:
+        chunks.append('\n'.join(header + records))
+
+    return chunks
 
 
 def __is_json(src, delimiter, specified_types, logger, keys: list, values_list: list) -> bool:
+    flatten_body = __load_flatten_json(src, delimiter, logger)
+    if flatten_body is None:
+        return False
+
+    keys.extend(flatten_body.keys())
+    values_list.append(list(flatten_body.values()))
+    return True
+
+
+def __load_flatten_json(src, delimiter, logger) -> dict:
+    """Return flatten dict of JSON src. If src is not JSON, will return None."""
     try:
-        body = json.loads(src)
-        flatten_body = util.flatten(body, delimiter=delimiter)
-        keys.extend(flatten_body.keys())
-        values_list.append(list(flatten_body.values()))
+        if not isinstance(src, (str, bytes, bytearray)):
+            src = bytes(src)  # memoryview, mmap
+        return util.flatten(json_backend.loads(src), delimiter=delimiter)
+
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logger.debug("%s: is not JSON", src)
+        return None
+
+
+def __is_multi_jsons(src, delimiter, specified_types, logger, keys: list, values_list: list, min_rows=2) -> bool:
+    key_indices = {}  # union set of keys -> column index
+    rows = []
+    blank_lines = 0
+
+    for line_no, line in enumerate(__iter_lines(src), 1):
+        line = line.strip()
+        if not line:
+            blank_lines += 1
+            continue
+        if blank_lines > 0 and len(rows) > 0:
+            logger.debug(f"Found blank line in L:{line_no - 1}")
+            return False
+        blank_lines = 0
 
-        return True
+        flatten_body = __load_flatten_json(line, delimiter, logger)
+        if flatten_body is None:
+            logger.debug(f"Found line is not JSON in L:{line_no}")
+            return False
+
+        append_union_rows(flatten_body.keys(), [list(flatten_body.values())], key_indices, rows)
 
-    except json.JSONDecodeError:
-        logger.debug(f"{src}: is not JSON")
+    # Line count is less than min_rows, it's not multiline json.
+    if len(rows) < min_rows:
+        logger.debug(f"src is not JSON multiline because row count is too few ({len(rows)})")
         return False
 
+    # All lines are already read at here.
+    pad_union_rows(key_indices, rows, keys, values_list)
 
-def __is_multi_jsons(raw_src, delimiter, specified_types, logger, keys: list, values_list: list) -> bool:
-    src = raw_src.strip()
-    lines = [s.strip() for s in src.split('\n')]
+    # All lines are able to parse as Json !
+    return True
 
-    # Line count is less than 1, it's not multiline json.
-    if len(lines) <= 1:
-        logger.debug(f"{src}: is not JSON multiline because row count is too few ({len(lines)})")
-        return False
 
-    unique_keys = collections.OrderedDict()  # to make unique key set
-    key_value_list = []
+def iter_json_lines(lines, json_delimiter="__", batch_size=10000, logger=logging.getLogger("lakeweed__format_inferencer")):
+    """
+    Parse iterable of JSON lines lazily and yield batches of records.
 
-    for line in lines:
-        single_keys = []
-        single_values = []
-        if not __is_json(line, delimiter, specified_types, logger, single_keys, single_values):
-            logger.debug(f"Found line is not JSON in L:{len(values_list)+1}")
-            return False
+    Arguments:
+        lines -- Iterable of str or bytes lines. e.g. file object opened by open().
 
-        # If JSONs has different keys each other, this function will return union set of keys
-        tmp_key_value = {}
-        for idx, k in enumerate(single_keys):
-            if k not in unique_keys.keys():
-                # new key is found.
-                unique_keys[k] = True
-            tmp_key_value[k] = single_values[0][idx]  # value will be store single list into __is_json.
+    Keyword Arguments:
+        batch_size -- Maximum number of records in a batch. (default: {10000})
 
-        key_value_list.append(tmp_key_value)
+    Yields:
+        tuple -- (Keys, Record List) for each batch. Same as inferencial_parse but only for records in the batch.
+                 Blank lines are ignored, lines that are not JSON are skipped with warning.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive: {batch_size}")
 
-    # All lines are already read at here.
-    for key_value in key_value_list:
+    key_indices = {}
+    rows = []
 
-        values_in_this_line = []
-        for uk in unique_keys:
-            v = key_value[uk] if uk in key_value.keys() else None
-            values_in_this_line.append(v)
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
 
-        values_list.append(values_in_this_line)
+        flatten_body = __load_flatten_json(line, json_delimiter, logger)
+        if flatten_body is None:
+            logger.warning(f"Skip line is not JSON in L:{line_no}")
+            continue
+
+        append_union_rows(flatten_body.keys(), [list(flatten_body.values())], key_indices, rows)
+
+        if len(rows) >= batch_size:
+            keys = []
+            values_list = []
+            pad_union_rows(key_indices, rows, keys, values_list)
+            yield keys, values_list
+
+            key_indices = {}
+            rows = []
+
+    if len(rows) > 0:
+        keys = []
+        values_list = []
+        pad_union_rows(key_indices, rows, keys, values_list)
+        yield keys, values_list
+
+
+def append_union_rows(keys, values_list, key_indices: dict, rows: list):
+    """
+    Append values_list whose columns are keys to rows whose columns are union set of keys of all appended values.
+    key_indices maps each key to column index. New keys get next index, so rows appended before them are shorter than columns.
+    Call pad_union_rows after all values are appended.
+    """
+    positions = [key_indices.setdefault(k, len(key_indices)) for k in keys]
+    column_count = len(key_indices)
+    if len(positions) == column_count and positions == list(range(column_count)):
+        rows.extend(values_list)  # Same columns as union set, so values are used as they are.
+        return
+
+    for values in values_list:
+        row = [None] * column_count
+        for idx, v in zip(positions, values):
+            row[idx] = v
+        rows.append(row)
 
-    keys.extend(unique_keys.keys())
-    # All lines are able to parse as Json !
-    return True
 
+def pad_union_rows(key_indices: dict, rows: list, keys: list, values_list: list):
+    """Pad rows appended by append_union_rows to the same length, then extend keys and values_list by union set of keys and rows."""
+    # Rows read before new keys were found are shorter than columns.
+    column_count = len(key_indices)
+    for row in rows:
+        if len(row) < column_count:
+            row.extend([None] * (column_count - len(row)))
 
-def __is_csv(raw_src, specified_types, logger, keys: list, values_list: list) -> bool:
-    src = raw_src.strip()
+    keys.extend(key_indices.keys())
+    values_list.extend(rows)
 
+
+def __is_csv(src, specified_types, logger, keys: list, values_list: list) -> bool:
     # Line count is less than 1, it's csv only header or not csv.
-    if len(src.split()) <= 1:
-        logger.debug(f"{src}: is not CSV because row count is too few ({len(src.split())})")
+    if (MultiTokenPattern if isinstance(src, str) else MultiTokenBytesPattern).search(src) is None:
+        logger.debug("%s: is not CSV because row count is too few", src)
         return False
 
     # If pandas can read src as csv, it is guessed csv.
+    import pandas as pd  # pandas is slow to import, so import only if CSV is provided.
     try:
-        with StringIO(src) as io:
-            df = pd.read_csv(io, skipinitialspace=True)  # Todo apply specified types by dtype ?
+        reader = StringIO(src.strip()) if isinstance(src, str) else io.BufferedReader(__BufferReader(src))
+        with reader:
+            df = pd.read_csv(reader, skipinitialspace=True)  # Todo apply specified types by dtype ?
 
             keys.extend(list(df.columns))
 
@@ -128,5 +372,112 @@ def __is_csv(raw_src, specified_types, logger, keys: list, values_list: list) ->
 
         return True
     except ValueError as e:
-        logger.debug(f"{src}: is not CSV. {e}")
+        logger.debug("%s: is not CSV. %s", src, e)
+        return False
+
+
+# Same as default values of pandas.read_csv
+CsvNaValues = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+CsvBoolValues = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+
+def __is_csv_stdlib(src, specified_types, logger, keys: list, values_list: list) -> bool:
+    """
+    Parse src as CSV by csv module like pandas.read_csv(skipinitialspace=True).
+    Values in a column are converted to int, float, or bool if all values in the column can be converted, otherwise they are str.
+    Differences from pandas: Rows which have more fields than the header are not CSV, and int values are not converted to float by other columns.
+    """
+
+    # Line count is less than 1, it's csv only header or not csv.
+    if (MultiTokenPattern if isinstance(src, str) else MultiTokenBytesPattern).search(src) is None:
+        logger.debug("%s: is not CSV because row count is too few", src)
         return False
+
+    if isinstance(src, str):
+        lines = StringIO(src)
+    else:
+        lines = (line.decode('utf-8') for line in __iter_lines(src, keepends=True))
+
+    header = None
+    rows = []
+    try:
+        for row in csv.reader(__strip_bom(lines), skipinitialspace=True):
+            if len(row) == 0 or (len(row) == 1 and not row[0].strip()):
+                continue  # blank line
+            if header is None:
+                header = row
+                continue
+            if len(row) > len(header):
+                logger.debug(f"src is not CSV. Expected {len(header)} fields in L:{len(rows) + 2}, saw {len(row)}")
+                return False
+            if len(row) < len(header):
+                row.extend([''] * (len(header) - len(row)))
+            rows.append(row)
+    except (csv.Error, UnicodeDecodeError) as e:
+        logger.debug("%s: is not CSV. %s", src, e)
+        return False
+
+    for idx in range(len(header)):
+        convert = __csv_column_converter(rows, idx)
+        for row in rows:
+            row[idx] = convert(row[idx])
+
+    keys.extend(__csv_column_names(header))
+    values_list.extend(rows)
+    return True
+
+
+def __strip_bom(lines):
+    """Strip UTF-8 BOM at the start of the first line like pandas."""
+    for idx, line in enumerate(lines):
+        yield line[1:] if idx == 0 and line.startswith('\ufeff') else line
+
+
+def __csv_column_names(header) -> list:
+    names = []
+    for idx, name in enumerate(header):
+        if name == '':
+            name = f"Unnamed: {idx}"
+        unique_name = name
+        count = 0
+        while unique_name in names:
+            count += 1
+            unique_name = f"{name}.{count}"
+        names.append(unique_name)
+    return names
+
+
+def __csv_column_converter(rows, idx):
+    values = [row[idx] for row in rows if row[idx] not in CsvNaValues]
+    has_na = len(values) < len(rows)
+
+    for kind, convert in [(int, __csv_int), (float, __csv_float), (bool, CsvBoolValues.__getitem__)]:
+        try:
+            for v in values:
+                convert(v)
+        except (ValueError, KeyError):
+            continue
+
+        if kind is int and has_na:
+            convert = __csv_float  # Int column which has NaN is float column in pandas.
+        return lambda v: None if v in CsvNaValues else convert(v)
+
+    return lambda v: None if v in CsvNaValues else v
+
+
+def __csv_int(value: str) -> int:
+    if '_' in value:
+        raise ValueError(value)
+    v = int(value)
+    if not -2**63 <= v < 2**63:
+        raise ValueError(value)
+    return v
+
+
+def __csv_float(value: str) -> float:
+    if '_' in value:
+        raise ValueError(value)
+    return float(value)
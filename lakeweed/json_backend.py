@@ -0,0 +1,95 @@
+"""
+JSON decoder/encoder used by lakeweed.
+A faster decoder is used if it's installed, otherwise json module is used. Results are the same as json module.
+
+    from lakeweed import json_backend
+    json_backend.set_backend("stdlib")
+"""
+import json
+
+Auto: str = "auto"
+Stdlib: str = "stdlib"
+Orjson: str = "orjson"
+
+# orjson parses integers which exceed 64bit as float, json module parses them as int.
+# Sources which have 19 digits (negative integers less than -2^63) are decoded by json module.
+# Digits are mapped to "0" and others to " " by bytes.translate, it's faster than regex search.
+DigitsTable = bytes(0x30 if 0x30 <= c <= 0x39 else 0x20 for c in range(256))
+LongIntegerDigits = b"0" * 19
+
+
+class JsonBackend:
+    """
+    Pair of loads and dumps functions.
+    loads must accept str and bytes, and raise json.JSONDecodeError for invalid JSON.
+    """
+
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+
+def stdlib_backend() -> JsonBackend:
+    return JsonBackend(Stdlib, json.loads, json.dumps)
+
+
+def orjson_backend() -> JsonBackend:
+    """Raise ImportError if orjson is not installed."""
+    import orjson
+
+    def loads(src):
+        try:
+            encoded = src.encode('utf-8') if isinstance(src, str) else src if isinstance(src, (bytes, bytearray)) else bytes(src)
+        except UnicodeEncodeError:
+            return json.loads(src)  # lone surrogate
+        if LongIntegerDigits not in encoded.translate(DigitsTable):
+            try:
+                return orjson.loads(encoded)
+            except orjson.JSONDecodeError:
+                pass  # e.g. NaN, lone surrogate. json module may accept them.
+        return json.loads(encoded)
+
+    # orjson.dumps returns compact bytes, so json.dumps is used to keep the same output.
+    return JsonBackend(Orjson, loads, json.dumps)
+
+
+__Backends = {
+    Stdlib: stdlib_backend,
+    Orjson: orjson_backend,
+}
+
+backend = None
+
+
+def set_backend(name_or_backend=Auto) -> JsonBackend:
+    """
+    Select JSON backend by name(Auto, Stdlib, or Orjson) or JsonBackend object.
+    Auto selects the fastest installed backend.
+    """
+    global backend, loads, dumps
+
+    if isinstance(name_or_backend, JsonBackend):
+        backend = name_or_backend
+    elif name_or_backend == Auto:
+        try:
+            backend = orjson_backend()
+        except ImportError:
+            backend = stdlib_backend()
+    elif name_or_backend in __Backends:
+        backend = __Backends[name_or_backend]()
+    else:
+        raise ValueError(f"JSON backend '{name_or_backend}' is not supported.")
+
+    loads = backend.loads
+    dumps = backend.dumps
+    return backend
+
+
+def get_backend() -> JsonBackend:
+    return backend
+
+
+loads = json.loads
+dumps = json.dumps
+set_backend(Auto)
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+
+from .time_parser import ColumnTimeParser, DateTimeWithNS, RequiredTimePattern, parse_cache_info
+from .util import data_types
+
+
+class ColumnProfile:
+    """
+    Cost of a column accumulated over calls.
+
+    Attributes:
+        column -- Column name.
+        values -- Number of values whose type was inferred.
+        inference_seconds -- Time to infer types of values, including datetime parsing.
+        conversion_seconds -- Time to convert values to Clickhouse values.
+        time_parse_exceptions -- Number of exceptions raised by datetime parsing. Strings which are not datetime raise them in inference.
+        dateutil_calls -- Number of values parsed by dateutil because they did not match the learned datetime layout.
+                          Values found in the parse cache of elastic_time_parse are not counted.
+        conversion_failures -- Number of values which were not None but converted to None.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.values = 0
+        self.inference_seconds = 0.0
+        self.conversion_seconds = 0.0
+        self.time_parse_exceptions = 0
+        self.dateutil_calls = 0
+        self.conversion_failures = 0
+
+    @property
+    def total_seconds(self) -> float:
+        return self.inference_seconds + self.conversion_seconds
+
+    def __repr__(self) -> str:
+        return (f"ColumnProfile(column={self.column!r}, total_seconds={self.total_seconds:.6f}, "
+                f"inference_seconds={self.inference_seconds:.6f}, conversion_seconds={self.conversion_seconds:.6f}, "
+                f"time_parse_exceptions={self.time_parse_exceptions}, dateutil_calls={self.dateutil_calls}, "
+                f"conversion_failures={self.conversion_failures}, values={self.values})")
+
+
+class ProfiledTimeParser(ColumnTimeParser):
+    """ColumnTimeParser which counts dateutil calls and exceptions to ColumnProfile."""
+
+    def __init__(self, profile: ColumnProfile):
+        super().__init__()
+        self.profile = profile
+
+    def _elastic_parse(self, src, tz_str) -> DateTimeWithNS:
+        cache_info = parse_cache_info()
+        try:
+            return super()._elastic_parse(src, tz_str)
+        except Exception:
+            self.profile.time_parse_exceptions += 1
+            raise
+        finally:
+            if src is not None and RequiredTimePattern.match(src) and (cache_info is None or parse_cache_info().misses > cache_info.misses):
+                self.profile.dateutil_calls += 1
+
+
+class ColumnProfiler:
+    """
+    Attributes cost of type inference and conversion to each column name.
+    Pass it as profiler argument of data_string2type_value, then read ranked report.
+    Values are inferred and converted one by one to measure them, so data_string2type_value is slower while profiling.
+    Types inferred with cached schema (schema_cache) are counted by dateutil_calls and time_parse_exceptions, but not by inference_seconds.
+    """
+
+    def __init__(self):
+        self.profiles = OrderedDict()
+
+    def profile(self, column) -> ColumnProfile:
+        profile = self.profiles.get(column)
+        if profile is None:
+            profile = self.profiles[column] = ColumnProfile(column)
+        return profile
+
+    def time_parsers(self, columns) -> list:
+        return [ProfiledTimeParser(self.profile(c)) for c in columns]
+
+    def data_types(self, columns, values_list, time_parsers, tz_str, parsed_datetimes_list) -> list:
+        """Same as util.data_types for each values in values_list, but measure each column."""
+        profiles = [self.profile(c) for c in columns]
+        types_list = []
+        for values, parsed_datetimes in zip(values_list, parsed_datetimes_list):
+            types = []
+            for idx, (value, p, profile) in enumerate(zip(values, time_parsers, profiles)):
+                parsed = {}
+                start = time.perf_counter()
+                types.extend(data_types([value], [p], tz_str, parsed))
+                profile.inference_seconds += time.perf_counter() - start
+                profile.values += 1
+                if parsed:
+                    parsed_datetimes[idx] = parsed[0]
+            types_list.append(types)
+        return types_list
+
+    def converters(self, columns, converters) -> tuple:
+        """Wrap converters to measure each column."""
+        return tuple(self.__converter(self.profile(c), convert) for c, convert in zip(columns, converters))
+
+    @staticmethod
+    def __converter(profile, convert):
+        def profiled(value):
+            start = time.perf_counter()
+            ch_value = convert(value)
+            profile.conversion_seconds += time.perf_counter() - start
+            if ch_value is None and value is not None:
+                profile.conversion_failures += 1
+            return ch_value
+        return profiled
+
+    def report(self, top=None) -> list:
+        """Return ColumnProfiles ranked by total_seconds. If top is provided, return only top columns."""
+        ranked = sorted(self.profiles.values(), key=lambda p: p.total_seconds, reverse=True)
+        return ranked if top is None else ranked[:top]
+
+    def clear(self):
+        self.profiles.clear()
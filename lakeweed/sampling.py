@@ -0,0 +1,46 @@
+import random
+
+Head: str = "head"              # First records
+Random: str = "random"          # Uniform random records
+Stratified: str = "stratified"  # A random record from each equal sized range
+
+
+class Sampling:
+    """
+    How to choose records used for type inference of large batch.
+    Records which are not sampled are only validated against the inferred types,
+    and types are inferred again with records which do not fit.
+
+    Keyword Arguments:
+        size -- Number of sampled records. (default: {1000})
+        method -- Head, Random, or Stratified. (default: {Head})
+        seed -- Seed of random for Random and Stratified. (default: {None})
+        max_reinference -- Maximum number of records which do not fit the inferred types.
+                           If more records do not fit, types are inferred with all records. (default: {1000})
+    """
+
+    def __init__(self, size=1000, method=Head, seed=None, max_reinference=1000):
+        if size <= 0:
+            raise ValueError(f"size must be positive: {size}")
+        if method not in (Head, Random, Stratified):
+            raise ValueError(f"Sampling method '{method}' is not supported.")
+
+        self.size = size
+        self.method = method
+        self.max_reinference = max_reinference
+        self.__random = random.Random(seed)
+
+    def indices(self, count) -> list:
+        """Return sorted indices of sampled records in count records."""
+        if count <= self.size:
+            return list(range(count))
+
+        if self.method == Head:
+            return list(range(self.size))
+
+        if self.method == Random:
+            return sorted(self.__random.sample(range(count), self.size))
+
+        # Stratified
+        step = count / self.size
+        return [int(i * step) + self.__random.randrange(max(1, int((i + 1) * step) - int(i * step))) for i in range(self.size)]
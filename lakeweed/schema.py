@@ -0,0 +1,126 @@
+import logging
+from collections import OrderedDict, namedtuple
+
+from .inferencial_parser import inferencial_parse
+from .time_parser import ColumnTimeParser
+from .util import data_types, upcast_data_types, upcast_data_type, specified_type2lakeweed_type, resolve_unknown_data_type
+
+SchemaCacheInfo = namedtuple("SchemaCacheInfo", ["hits", "misses", "mismatches", "maxsize", "currsize"])
+
+
+class SchemaCache:
+    """
+    Bounded LRU cache of schemas keyed by fingerprint of column names and specified types.
+    Records which have the same structure can skip type inference by using the cached schema.
+
+    Counters:
+        hits -- Number of lookups the schema was found.
+        misses -- Number of lookups the schema was not found.
+        mismatches -- Number of found schemas which could not store the values, so inferred again.
+    """
+
+    def __init__(self, maxsize=128):
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive: {maxsize}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+        self.__schemas = OrderedDict()
+
+    @staticmethod
+    def fingerprint(columns, specified_types=None) -> tuple:
+        specified = tuple(sorted((specified_types or {}).items()))
+        return (tuple(columns), specified)
+
+    def get(self, key):
+        schema = self.__schemas.get(key)
+        if schema is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__schemas.move_to_end(key)
+        return schema
+
+    def put(self, key, schema):
+        self.__schemas[key] = schema
+        self.__schemas.move_to_end(key)
+        while len(self.__schemas) > self.maxsize:
+            self.__schemas.popitem(last=False)
+
+    def mismatch(self, key):
+        self.mismatches += 1
+        self.__schemas.pop(key, None)
+
+    def clear(self):
+        self.__schemas.clear()
+        self.hits = self.misses = self.mismatches = 0
+
+    def cache_info(self) -> SchemaCacheInfo:
+        return SchemaCacheInfo(self.hits, self.misses, self.mismatches, self.maxsize, len(self.__schemas))
+
+
+SchemaChange = namedtuple("SchemaChange", ["column", "old_type", "new_type"])
+
+
+class SchemaTracker:
+    """
+    Keep types of columns across batches, and widen them with the upcasting rules of lakeweed types.
+    Only new batch is inferred, and changes of types are reported.
+
+    Columns which have only null values (or empty arrays) so far are not reported until the type is estimated,
+    because the type may be changed to narrower one.
+    """
+
+    def __init__(self, specified_types=None, json_delimiter="__", logger=logging.getLogger("lakeweed__schema")):
+        self.specified_types = {} if specified_types is None else specified_types
+        self.json_delimiter = json_delimiter
+        self.logger = logger
+        self.__types = OrderedDict()  # column -> upcasted type (None if not estimated yet)
+
+    @property
+    def column_types(self) -> OrderedDict:
+        """Types of estimated columns. Same as step 3 and 4 of clickhouse.data_string2type_value."""
+        return OrderedDict((c, resolve_unknown_data_type(t)) for c, t in self.__types.items() if self.__is_estimated(t))
+
+    def update(self, src_str, tz_str=None, format=None) -> list:
+        """
+        Infer types of src_str and fold them into tracked types.
+
+        Returns:
+            list -- List of SchemaChange(column, old_type, new_type). old_type is None if the column is new.
+        """
+        (format, keys, values_list) = inferencial_parse(src_str, self.specified_types, self.json_delimiter, self.logger, format=format)
+        return self.update_values(keys, values_list, tz_str)
+
+    def update_values(self, keys, values_list, tz_str=None) -> list:
+        """Same as update, but for keys and record list returned by inferencial_parse."""
+        time_parsers = [ColumnTimeParser() for _ in keys]
+        types = upcast_data_types([data_types(values, time_parsers, tz_str) for values in values_list])
+        return self.update_types(keys, types)
+
+    def update_types(self, columns, types) -> list:
+        """Same as update, but for types returned by util.upcast_data_types."""
+        changes = []
+        for c, t in zip(columns, types):
+            if c in self.specified_types:
+                t = specified_type2lakeweed_type(self.specified_types[c])
+
+            old = self.__types.get(c)
+            new = t if c not in self.__types else upcast_data_type(old, t)
+            self.__types[c] = new
+
+            if not self.__is_estimated(new):
+                continue
+            if not self.__is_estimated(old):
+                changes.append(SchemaChange(c, None, resolve_unknown_data_type(new)))
+            elif old != new:
+                changes.append(SchemaChange(c, resolve_unknown_data_type(old), resolve_unknown_data_type(new)))
+
+        return changes
+
+    @staticmethod
+    def __is_estimated(data_type) -> bool:
+        return data_type is not None and data_type != 'Array(Empty)'
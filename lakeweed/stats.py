@@ -0,0 +1,57 @@
+from collections import OrderedDict, namedtuple
+
+# Stage names. Detection attempts are recorded as "detect:<format>" e.g. "detect:json_lines".
+Detect = "detect"
+SchemaCacheLookup = "schema_cache"
+DataTypes = "1:data_types"
+Upcast = "2:upcast"
+SpecifiedTypes = "3:specified_types"
+UnknownTypes = "4:unknown_types"
+Conversion = "5:conversion"
+
+StageRecord = namedtuple("StageRecord", ["stage", "seconds", "rows", "columns"])
+
+
+class PipelineStats:
+    """
+    Records wall time, row count and column count of each stage of data_string2type_value.
+    Pass it as stats argument, then read records or forward them to metrics system by callback.
+    If stats argument is not provided, nothing is measured.
+
+    Stages:
+        detect:<format> -- Each attempt to parse src as the format in inferencial_parse, including JSON decoding and flattening.
+                           rows and columns are 0 if src is not the format.
+        schema_cache -- Lookup of cached schema and validation of values with it.
+        1:data_types -- Mapping values to lakeweed types. Datetime strings are parsed here.
+        2:upcast -- Upcasting types of records.
+        3:specified_types -- Overwriting by specified types and appending missing specified columns.
+        4:unknown_types -- Resolving unknown types to String.
+        5:conversion -- Converting values to Clickhouse values.
+
+    rows of 3:specified_types and 4:unknown_types are 0, because they work on columns only.
+    A stage can be recorded multiple times in a call. e.g. type inference is run again if sampled types do not fit.
+    """
+
+    def __init__(self, callback=None):
+        """
+        Keyword Arguments:
+            callback -- Function called with StageRecord each time a stage is recorded. (default: {None})
+        """
+        self.callback = callback
+        self.records = []
+
+    def record(self, stage, seconds, rows, columns):
+        record = StageRecord(stage, seconds, rows, columns)
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def totals(self) -> OrderedDict:
+        """Return total seconds of each stage in order of first record."""
+        totals = OrderedDict()
+        for r in self.records:
+            totals[r.stage] = totals.get(r.stage, 0.0) + r.seconds
+        return totals
+
+    def clear(self):
+        self.records.clear()
@@ -2,9 +2,7 @@ import datetime
 import re
 from dataclasses import dataclass
 from datetime import timezone
-
-import pytz
-from dateutil.parser import parse
+from functools import lru_cache
 
 NanosecPattern = re.compile(r".+\.(\d+).*")
 RequiredTimePattern = re.compile(r".*\d\d?[/:-]\d\d?.*")
@@ -12,6 +10,12 @@ RequiredTimePattern = re.compile(r".*\d\d?[/:-]\d\d?.*")
 
 @dataclass
 class DateTimeWithNS:
+    """
+    Parsed datetime with nanosec part. It has no __dict__ to keep many parsed values with less memory.
+    original_string is None if it's not kept. See ColumnTimeParser.
+    """
+    __slots__ = ("datetime", "nanosec", "original_string")
+
     datetime: datetime.datetime
     nanosec: int
     original_string: str
@@ -20,6 +24,8 @@ class DateTimeWithNS:
         return (self.datetime, self.nanosec)
 
     def __str__(self) -> str:
+        if self.original_string is None:
+            return self.datetime.isoformat()
         return self.original_string
 
     @classmethod
@@ -28,25 +34,282 @@ class DateTimeWithNS:
 
 
 def elastic_time_parse(src, tz_str=None, logger=None) -> DateTimeWithNS:
-    """Parse src string as datetime and nanosec part. Raise exception if src format is NOT valid. """
+    """
+    Parse src string as datetime and nanosec part. Raise exception if src format is NOT valid.
+    Results of strings parsed by dateutil are kept in LRU cache keyed by src and tz_str. See set_parse_cache.
+    """
     if src is None:
         raise ValueError
 
     if not re.match(RequiredTimePattern, src):
         raise ValueError
 
+    if __cached_parse is None:
+        return _dateutil_parse(src, tz_str)
+
+    ret = __cached_parse(src, tz_str)
+    if ret is None:
+        raise ValueError(f"{src} is not datetime")
+    return ret
+
+
+def _dateutil_parse(src, tz_str) -> DateTimeWithNS:
+    from dateutil.parser import parse  # dateutil and pytz are imported only if they are needed.
+
     nano = 0
-    ret = parse(src)
+    ret = _with_timezone(parse(src), tz_str)
+
+    m = NanosecPattern.match(src)
+    if(m is not None):
+        nano = int(m.group(1)[0:9].ljust(9, '0'))
+
+    return DateTimeWithNS(ret, nano, src)
+
+
+def _dateutil_parse_or_none(src, tz_str) -> DateTimeWithNS:
+    try:
+        return _dateutil_parse(src, tz_str)
+    except Exception:
+        return None  # Known not datetime
+
+
+DefaultParseCacheSize = 4096
+__cached_parse = lru_cache(maxsize=DefaultParseCacheSize)(_dateutil_parse_or_none)
+
+
+def set_parse_cache(maxsize=DefaultParseCacheSize):
+    """
+    Replace LRU cache of elastic_time_parse by new one which keeps maxsize results at most.
+    Both datetimes and strings which are not datetime are cached. If maxsize is None or 0, results are not cached.
+    Strings which do not look like datetime are rejected without dateutil, so they are not cached.
+    """
+    global __cached_parse
+    if maxsize is not None and maxsize < 0:
+        raise ValueError(f"maxsize must not be negative: {maxsize}")
+    __cached_parse = lru_cache(maxsize=maxsize)(_dateutil_parse_or_none) if maxsize else None
+
+
+def parse_cache_info():
+    """Return (hits, misses, maxsize, currsize) of LRU cache of elastic_time_parse. If it's disabled, will return None."""
+    return None if __cached_parse is None else __cached_parse.cache_info()
+
+
+def clear_parse_cache():
+    if __cached_parse is not None:
+        __cached_parse.cache_clear()
+
+
+def _with_timezone(ret: datetime.datetime, tz_str) -> datetime.datetime:
     if ret.tzinfo is None:
+        if not tz_str:
+            return ret.replace(tzinfo=timezone.utc)  # pytz.timezone raises for None or empty tz_str
         try:
+            import pytz
             tz_info = pytz.timezone(tz_str)
             offset = timezone(tz_info.utcoffset(ret))
             ret = ret.replace(tzinfo=offset)
         except Exception:
             ret = ret.replace(tzinfo=timezone.utc)
+    return ret
 
-    m = NanosecPattern.match(src)
-    if(m is not None):
-        nano = int(m.group(1)[0:9].ljust(9, '0'))
 
-    return DateTimeWithNS(ret, nano, src)
+# -----------------------------------------------------------------
+LayoutPattern = re.compile(
+    r"(?P<year>\d{4})(?P<date_sep>[-/])(?P<month>\d{1,2})(?P=date_sep)(?P<day>\d{1,2})"
+    r"(?:(?P<time_sep>[T ])(?P<hour>\d{1,2}):(?P<minute>\d{1,2})(?::(?P<second>\d{1,2})(?P<fraction>\.\d*)?)?)?"
+    r"(?P<tz>\s*(?:Z|[+-]\d{2}(?::?\d{2})?))?"
+)
+
+
+class TimeLayout:
+    """
+    Compiled layout of ISO 8601 like datetime string, e.g. '2019/09/15 14:50:03.101 +0900'.
+    It parses strings written in the same layout without dateutil.
+    """
+    __layouts = {}
+
+    def __init__(self, date_sep, time_sep, has_second, has_fraction, has_tz):
+        pattern = rf"(\d{{4}}){re.escape(date_sep)}(\d{{1,2}}){re.escape(date_sep)}(\d{{1,2}})"
+        if time_sep is not None:
+            pattern += rf"{time_sep}(\d{{1,2}}):(\d{{1,2}})"
+            if has_second:
+                pattern += r":(\d{1,2})"
+                if has_fraction:
+                    pattern += r"\.(\d*)"
+        if has_tz:
+            pattern += r"\s*(Z|[+-]\d{2}(?::?\d{2})?)"
+
+        self.pattern = re.compile(pattern)
+        self.has_time = time_sep is not None
+        self.has_second = has_second
+        self.has_fraction = has_fraction
+        self.has_tz = has_tz
+
+    @classmethod
+    def learn(cls, src: str, parsed: DateTimeWithNS):
+        """Return layout of src if the layout can parse src same as parsed value, otherwise return None."""
+        m = LayoutPattern.fullmatch(src)
+        if m is None:
+            return None
+
+        key = (m.group("date_sep"), m.group("time_sep"), m.group("second") is not None, m.group("fraction") is not None, m.group("tz") is not None)
+        layout = cls.__layouts.get(key)
+        if layout is None:
+            layout = cls.__layouts[key] = cls(*key)
+
+        ret = layout.parse(src)
+        if ret is None or ret.tupple() != parsed.tupple() or ret.datetime.utcoffset() != parsed.datetime.utcoffset():
+            return None
+        return layout
+
+    def parse(self, src: str, tz_str=None, keep_original_string=True) -> DateTimeWithNS:
+        """Parse src as datetime and nanosec part. Return None if src does not match this layout."""
+        m = self.pattern.fullmatch(src)
+        if m is None:
+            return None
+        groups = m.groups()
+
+        try:
+            year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
+            hour = minute = second = micro = nano = 0
+            idx = 3
+            if self.has_time:
+                hour, minute = int(groups[3]), int(groups[4])
+                idx = 5
+                if self.has_second:
+                    second = int(groups[5])
+                    idx = 6
+                    if self.has_fraction:
+                        fraction = groups[6]
+                        micro = int(fraction[0:6].ljust(6, '0'))
+                        nano = int(fraction[0:9].ljust(9, '0'))
+                        idx = 7
+
+            tzinfo = None
+            if self.has_tz:
+                tzinfo = _tz_offset(groups[idx])
+
+            ret = datetime.datetime(year, month, day, hour, minute, second, micro, tzinfo)
+        except ValueError:
+            return None
+
+        return DateTimeWithNS(_with_timezone(ret, tz_str), nano, src if keep_original_string else None)
+
+    def parse_epoch(self, src: str, tz_str=None, precision=9) -> int:
+        """
+        Parse src as epoch time in 10^-precision seconds without datetime object.
+        Return None if src does not match this layout, or timezone of tz_str is needed to parse it.
+        """
+        if not self.has_tz and tz_str is not None:
+            return None  # Offset of tz_str depends on the date, so parse it with datetime.
+        m = self.pattern.fullmatch(src)
+        if m is None:
+            return None
+        groups = m.groups()
+
+        year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
+        hour = minute = second = nano = 0
+        idx = 3
+        if self.has_time:
+            hour, minute = int(groups[3]), int(groups[4])
+            idx = 5
+            if self.has_second:
+                second = int(groups[5])
+                idx = 6
+                if self.has_fraction:
+                    nano = int(groups[6][0:9].ljust(9, '0'))
+                    idx = 7
+
+        if not (1 <= year and 1 <= month <= 12 and 1 <= day <= _days_in_month(year, month) and hour < 24 and minute < 60 and second < 60):
+            return None  # Same as ValueError of datetime
+
+        seconds = _days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+        if self.has_tz:
+            seconds -= _tz_offset_minutes(groups[idx]) * 60
+        return seconds * 10 ** precision + nano // 10 ** (9 - precision)
+
+
+def _tz_offset(tz: str) -> timezone:
+    if tz == 'Z':
+        return timezone.utc
+    return timezone(datetime.timedelta(minutes=_tz_offset_minutes(tz)))
+
+
+def _tz_offset_minutes(tz: str) -> int:
+    if tz == 'Z':
+        return 0
+    sign = -1 if tz[0] == '-' else 1
+    digits = tz[1:].replace(':', '')
+    return sign * (int(digits[0:2]) * 60 + int(digits[2:4] or 0))
+
+
+__DaysInMonth = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def _days_in_month(year, month) -> int:
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return __DaysInMonth[month - 1]
+
+
+def _days_from_civil(year, month, day) -> int:
+    """Return days from 1970-01-01 of proleptic Gregorian date."""
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+Epoch = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_epoch(parsed: DateTimeWithNS, precision=9) -> int:
+    """Return epoch time of parsed value in 10^-precision seconds, including nanosec part."""
+    dt = parsed.datetime
+    nano = parsed.nanosec if parsed.nanosec // 1000 == dt.microsecond else dt.microsecond * 1000
+    delta = (dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)) - Epoch
+    return (delta.days * 86400 + delta.seconds) * 10 ** precision + nano // 10 ** (9 - precision)
+
+
+class ColumnTimeParser:
+    """
+    Datetime parser for values in a column.
+    It learns layout from the first value parsed by elastic_time_parse, and parses following values in the same layout without dateutil.
+    Values which does not match the layout are parsed by elastic_time_parse.
+
+    If keep_original_string is False, parsed values do not keep source strings as original_string.
+    Source strings can be freed after they are replaced by parsed values, so memory usage of many kept datetimes is reduced.
+    """
+
+    def __init__(self, keep_original_string=True):
+        self.layout = None
+        self.learned = False
+        self.keep_original_string = keep_original_string
+
+    def parse(self, src, tz_str=None) -> DateTimeWithNS:
+        """Same as elastic_time_parse."""
+        if self.layout is not None and src is not None:
+            ret = self.layout.parse(src, tz_str, self.keep_original_string)
+            if ret is not None:
+                return ret
+
+        ret = self._elastic_parse(src, tz_str)
+        if not self.learned:
+            self.layout = TimeLayout.learn(src, ret)
+            self.learned = True
+        if not self.keep_original_string:
+            ret = DateTimeWithNS(ret.datetime, ret.nanosec, None)  # Cached value is shared, so it's not modified.
+        return ret
+
+    def parse_epoch(self, src, tz_str=None, precision=9) -> int:
+        """Same as parse, but return epoch time in 10^-precision seconds. Values matched the learned layout are parsed without datetime object."""
+        if self.layout is not None and src is not None:
+            ret = self.layout.parse_epoch(src, tz_str, precision)
+            if ret is not None:
+                return ret
+        return to_epoch(self.parse(src, tz_str), precision)
+
+    def _elastic_parse(self, src, tz_str) -> DateTimeWithNS:
+        return elastic_time_parse(src, tz_str=tz_str)
@@ -1,58 +1,156 @@
 
+import re
+
 from . import time_parser
 
 
+# Tree of flatten key names shared by records which have the same structure.
+# Node is dict of key -> [key name, prefix of nested keys, nested node]. It's cleared if too many key names are cached.
+__KeyTrees = {}  # (prefix, delimiter) -> root node
+__MaxCachedKeyNames = 100000
+__cached_key_names = 0
+
+
 def flatten(src: dict, target=None, prefix="", delimiter="."):
+    """
+    Flatten nested dict to dict of values keyed by joined keys. e.g. {"a": {"b": 1}} -> {"a.b": 1}
+    It does not recurse, so it can flatten dict of any depth. Key names are cached, so records share the same key objects.
+    """
+    global __cached_key_names
     if target is None:
         target = {}
 
-    for k, v in src.items():
-        key_name = f"{prefix}{k}"
-
-        if type(v) is dict:
-            if len(v) <= 0:
-                target[key_name] = {}
+    if __cached_key_names >= __MaxCachedKeyNames:
+        __KeyTrees.clear()
+        __cached_key_names = 0
+    node = __KeyTrees.get((prefix, delimiter))
+    if node is None:
+        node = __KeyTrees[(prefix, delimiter)] = {}
+
+    # Iterating items of a nested dict is suspended while its nested dict is flattened.
+    stack = []
+    items = iter(src.items())
+    while True:
+        for k, v in items:
+            entry = node.get(k)
+            if entry is None:
+                entry = node[k] = [f"{prefix}{k}", None, None]
+                __cached_key_names += 1
+
+            if type(v) is not dict:
+                target[entry[0]] = v
+            elif len(v) <= 0:
+                target[entry[0]] = {}
             else:
-                flatten(v, target=target, prefix=f"{key_name}{delimiter}", delimiter=delimiter)
+                if entry[2] is None:
+                    entry[1] = f"{entry[0]}{delimiter}"
+                    entry[2] = {}
+                stack.append((prefix, node, items))
+                (prefix, node, items) = (entry[1], entry[2], iter(v.items()))
+                break
         else:
-            target[key_name] = v
-
-    return target
-
-
-def data_types(values) -> list:
-    return [__data_type(v) for v in values]
+            if not stack:
+                return target
+            (prefix, node, items) = stack.pop()
+
+
+def data_types(values, time_parsers=None, tz_str=None, parsed_datetimes=None) -> list:
+    """
+    Keyword Arguments:
+        time_parsers -- List of time_parser.ColumnTimeParser correspond to values. If it's None, use elastic_time_parse.
+        tz_str -- timezone string used to parse datetime values.
+        parsed_datetimes -- dict to store DateTimeWithNS parsed from datetime values, keyed by index of values.
+                            It can be used to convert values without parsing again.
+    """
+    if time_parsers is None:
+        time_parses = [time_parser.elastic_time_parse] * len(values)
+    else:
+        time_parses = [p.parse for p in time_parsers]
+
+    types = []
+    for idx, (value, time_parse) in enumerate(zip(values, time_parses)):
+        if type(value) is list:
+            types.append(__data_type_list(value, time_parse, tz_str))
+            continue
+
+        t, parsed = __scalar_data_type(value, time_parse, tz_str)
+        if parsed is not None and parsed_datetimes is not None:
+            parsed_datetimes[idx] = parsed
+        types.append(t)
+
+    return types
+
+
+def fit_data_types(values, types, time_parsers, tz_str=None, parsed_datetimes=None) -> bool:
+    """
+    Return True if all values can be stored as types without upcasting. It's faster than data_types for known types.
+
+    Arguments:
+        types -- List of types correspond to values. Any value fits 'String'.
+        time_parsers, tz_str, parsed_datetimes -- Same as data_types.
+    """
+    for idx, (value, t, p) in enumerate(zip(values, types, time_parsers)):
+        if value is None or t == 'String':
+            continue
+        if t == 'Float':
+            if type(value) in (float, int, bool):
+                continue
+            return False
+        if t == 'Bool':
+            if type(value) is bool:
+                continue
+            return False
+        if t == 'DateTime':
+            if type(value) in (float, int, bool, list):
+                return False
+            dummy, parsed = __scalar_data_type(value, p.parse, tz_str)
+            if parsed is None:
+                return False
+            if parsed_datetimes is not None:
+                parsed_datetimes[idx] = parsed
+            continue
+        if t is None or type(value) is not list:
+            return False
+        if __upcast_data_type(t, __data_type_list(value, p.parse, tz_str)) != t:
+            return False
+
+    return True
+
+
+def __data_type(value, time_parse, tz_str):
+    if type(value) is list:
+        return __data_type_list(value, time_parse, tz_str)
+    return __scalar_data_type(value, time_parse, tz_str)[0]
 
 
-def __data_type(value):
+def __scalar_data_type(value, time_parse, tz_str) -> (str, time_parser.DateTimeWithNS):
     if value is None:
-        return None
+        return None, None
 
-    if type(value) is list:
-        return __data_type_list(value)
     if type(value) in (float, int):
-        return 'Float'
+        return 'Float', None
     if type(value) is bool:
-        return 'Bool'
+        return 'Bool', None
     # value is string
     try:
-        time_parser.elastic_time_parse(str(value)).tupple()
-        return 'DateTime'
+        parsed = time_parse(str(value), tz_str=tz_str)
+        parsed.tupple()
+        return 'DateTime', parsed
     except ValueError:
         pass
     except Exception:
         pass  # Todo logging
 
-    return 'String'
+    return 'String', None
 
 
-def __data_type_list(value_as_list):
+def __data_type_list(value_as_list, time_parse, tz_str):
     if len(value_as_list) <= 0:
         return 'Array(Empty)'
 
     # Todo: decide tye by upcast_data_types.
     inner_value = value_as_list[0]
-    inner_type = __data_type(inner_value)
+    inner_type = __data_type(inner_value, time_parse, tz_str)
     return f"Array({inner_type})"
 
 
@@ -76,16 +174,24 @@ __TypeMap = {
 }
 
 def upcast_data_types(types_list) -> list:
+    """Return types which can store values of each column in types_list. Order of types list correspond to a columns order."""
     if len(types_list) <= 0:
         return []
 
-    import copy
-    upcasted_type = copy.deepcopy(types_list[0])
+    # Upcasting is commutative and associative, so only the distinct types of each column are joined.
+    return [__CodeTypes[__upcast_codes(set(column_types))] for column_types in zip(*types_list)]
+
 
-    for types in types_list:
-        upcasted_type = [__upcast_data_type(t1, t2) for t1, t2 in zip(upcasted_type, types)]
+def upcast_data_type(type1, type2) -> str:
+    """Return a type which can store both type1 and type2 values."""
+    return __CodeTypes[__join_codes(__type_code(type1), __type_code(type2))]
 
-    return upcasted_type
+
+def __upcast_codes(types) -> int:
+    code = __NoneCode
+    for t in types:
+        code = __join_codes(code, __type_code(t))
+    return code
 
 
 def __upcast_data_type(type1, type2) -> str:
@@ -113,6 +219,49 @@ def __upcast_data_type(type1, type2) -> str:
     return __TypeMap.get(from_to, "String")
 
 
+# Types are coded as small integers, and upcasted by join table of codes.
+# Codes of types which are not in __BaseTypes (e.g. nested Array) are added at the first time they are found.
+__BaseTypes = [None, 'Float', 'Bool', 'DateTime', 'String',
+               'Array(Empty)', 'Array(None)', 'Array(Float)', 'Array(Bool)', 'Array(DateTime)', 'Array(String)']
+__TypeCodes = {}  # type -> code
+__CodeTypes = []  # code -> type
+__JoinTable = []  # code1 -> list of code2 -> code of upcasted type, or None if it's not computed yet
+__NoneCode = 0
+
+
+def __type_code(t) -> int:
+    code = __TypeCodes.get(t)
+    if code is None:
+        code = len(__CodeTypes)
+        __CodeTypes.append(t)
+        __JoinTable.append([])
+        __TypeCodes[t] = code
+    return code
+
+
+def __join_codes(code1, code2) -> int:
+    row = __JoinTable[code1]
+    if code2 < len(row):
+        joined = row[code2]
+        if joined is not None:
+            return joined
+    else:
+        row.extend([None] * (code2 + 1 - len(row)))
+
+    joined = __type_code(__upcast_data_type(__CodeTypes[code1], __CodeTypes[code2]))
+    row[code2] = joined
+    return joined
+
+
+def resolve_unknown_data_type(data_type) -> str:
+    """If the type could not be estimated, it should be a String because there is no information to estimate it."""
+    if data_type is None:
+        return 'String'
+    if get_array_inner_type(data_type) in ('Empty', 'None'):
+        return 'Array(String)'
+    return data_type
+
+
 # -----------------------------------------------------------------
 __AliasTypes = {
     'FLOAT': "Float",
@@ -132,12 +281,22 @@ def specified_type2lakeweed_type(specified_type):
 
 
 # -----------------------------------------------------------------
+ArrayTypePattern = re.compile(r"Array\((.+)\)", re.IGNORECASE)
+
+
 def get_array_inner_type(array_type: str) -> str:
-    import re
-    pattern = re.compile(r"Array\((.+)\)", re.IGNORECASE)
-    inner_type_m = pattern.match(array_type)
+    inner_type_m = ArrayTypePattern.match(array_type)
 
     if inner_type_m is None:
         return None
 
     return inner_type_m.group(1)
+
+
+def __init_join_table():
+    for t1 in __BaseTypes:
+        for t2 in __BaseTypes:
+            __join_codes(__type_code(t1), __type_code(t2))
+
+
+__init_join_table()
@@ -15,5 +15,6 @@ setup(
     keywords="json jsonline csv rabbitmq amqp clickhouse",
     url="https://github.com/tac0x2a/lake_weed",
     packages=['lakeweed'],
-    install_requires=_requires_from_file('requirements.txt')
+    install_requires=_requires_from_file('requirements.txt'),
+    extras_require={'fast': ['orjson']}
 )
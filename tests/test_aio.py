@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lakeweed import aio, clickhouse
+
+
+def test_data_string2type_value_in_executor():
+    src = '{"a": 1, "b": "hoge"}'
+
+    async def convert():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return await aio.data_string2type_value(src, executor=executor, specified_types={"a": "Int"})
+
+    assert clickhouse.data_string2type_value(src, specified_types={"a": "Int"}) == asyncio.run(convert())
+
+
+def test_data_string2type_value_bounded_by_semaphore(monkeypatch):
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def slow_convert(src_str, **kwargs):
+        with lock:
+            running.append(src_str)
+            max_running.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(src_str)
+        return src_str
+
+    monkeypatch.setattr(clickhouse, "data_string2type_value", slow_convert)
+
+    async def convert():
+        semaphore = asyncio.Semaphore(2)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            return await asyncio.gather(*[aio.data_string2type_value(str(i), executor=executor, semaphore=semaphore) for i in range(6)])
+
+    assert [str(i) for i in range(6)] == asyncio.run(convert())
+    assert 2 == max(max_running)
+
+
+def test_iter_data_string2type_value_keep_order_and_bound_in_flight():
+    messages = [f'{{"a": {i}}}' for i in range(10)]
+    read = []
+
+    async def produce():
+        for m in messages:
+            read.append(m)
+            yield m
+
+    async def consume():
+        results = []
+        async for result in aio.iter_data_string2type_value(produce(), in_flight=3):
+            assert len(read) - len(results) <= 3
+            results.append(result)
+        return results
+
+    results = asyncio.run(consume())
+    assert [clickhouse.data_string2type_value(m) for m in messages] == results
+
+
+def test_iter_data_string2type_value_accept_iterable_and_raise_exception():
+    async def consume():
+        return [r async for r in aio.iter_data_string2type_value(['{"a": 1}', '{"a": 2}'], in_flight=1)]
+
+    assert 2 == len(asyncio.run(consume()))
+
+    async def consume_invalid():
+        return [r async for r in aio.iter_data_string2type_value(['{"a": 1}'], in_flight=1, format="unknown")]
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume_invalid())
+
+    with pytest.raises(ValueError):
+        asyncio.run(aio.iter_data_string2type_value([], in_flight=0).__anext__())
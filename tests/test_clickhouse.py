@@ -1,3 +1,4 @@
+import pytest
 from datetime import datetime, timezone, timedelta
 
 from lakeweed import clickhouse
@@ -836,3 +837,299 @@ def test_return_empty_array_if_type_is_Array_value_is_null():
     )
     res = clickhouse.data_string2type_value(src)
     assert expected == res
+
+
+# --------------------------------
+# Streaming Cases
+
+def test_iter_data_lines_return_batches():
+    from io import StringIO
+
+    src = StringIO("""{ "f" : 42, "d": "2019/09/15 14:50:03.101 +0900" }
+{ "f" : 43, "d": null }
+{ "f" : "hoge" }
+""")
+
+    expected = [
+        (
+            ("f", "d"),
+            ("Float64", "DateTime64(6)"),
+            [
+                (42, datetime(2019, 9, 15, 14, 50, 3, 101000, timezone(timedelta(hours=9)))),
+                (43, None)
+            ]
+        ),
+        (
+            ("f", ),
+            ("String", ),
+            [("hoge", )]
+        ),
+    ]
+    res = list(clickhouse.iter_data_lines2type_value(src, batch_size=2))
+    assert expected == res
+
+
+def test_parse_datetime_once_for_each_value(monkeypatch):
+    from lakeweed.time_parser import ColumnTimeParser
+    parse = ColumnTimeParser.parse
+    called = []
+
+    def counting_parse(self, src, tz_str=None):
+        called.append(src)
+        return parse(self, src, tz_str=tz_str)
+    monkeypatch.setattr(ColumnTimeParser, "parse", counting_parse)
+
+    src = """
+    { "d": "2019/09/15 14:50:03.101 +0900" }
+    { "d": "2019/09/15 14:50:04.101 +0900" }
+    """
+    (columns, types, values) = clickhouse.data_string2type_value(src)
+    assert ("DateTime64(6)", ) == types
+    assert 2 == len(called)
+
+
+# --------------------------------
+# Columnar Cases
+
+def test_return_columnar_values():
+    import numpy as np
+
+    src = """
+    { "f" : 42,   "i" : "42", "b" : true, "d": "2019/09/15 14:50:03.101 +0900", "s" : "Hello,World", "a" : [1, 2] }
+    { "f" : null, "i" : null, "b" : null, "d": null,                            "s" : null,          "a" : null }
+    """
+    specified_types = {"i": "int"}
+
+    (columns, types, values) = clickhouse.data_string2type_value(src, specified_types=specified_types, columnar=True)
+    assert ("f", "i", "b", "d", "s", "a") == columns
+    assert ("Float64", "Int64", "UInt8", "DateTime64(6)", "String", "Array(Float64)") == types
+
+    (f, i, b, d, s, a) = values
+    assert np.float64 == f.dtype and np.int64 == i.dtype and np.uint8 == b.dtype
+    assert np.dtype("datetime64[us]") == d.dtype
+    assert object == s.dtype and object == a.dtype
+
+    assert [42.0, None] == f.tolist()
+    assert [42, None] == i.tolist()
+    assert [1, None] == b.tolist()
+    assert np.datetime64("2019-09-15T05:50:03.101000") == d[0]
+    assert d.mask[1]
+    assert ["Hello,World", None] == s.tolist()
+    assert [[1, 2], []] == a.tolist()
+
+
+def test_return_columnar_values_out_of_int64_range_as_object():
+    src = """
+    { "i" : 18446744073709551615, "d": "9999-12-31 23:59:59Z" }
+    { "i" : 1,                    "d": null }
+    """
+    (columns, types, values) = clickhouse.data_string2type_value(src, specified_types={"i": "Int"}, columnar=True, datetime_precision=9)
+    assert ("Int64", "DateTime64(9)") == types
+
+    (i, d) = values
+    assert object == i.dtype and object == d.dtype
+    assert [18446744073709551615, 1] == i.tolist()
+    assert [253402300799000000000, None] == d.tolist()
+
+
+# --------------------------------
+# Schema cache Cases
+
+def test_reuse_cached_schema_if_values_fit():
+    from lakeweed.schema import SchemaCache
+    cache = SchemaCache()
+
+    src1 = """{ "f" : 42, "d": "2019/09/15 14:50:03.101 +0900", "s" : "hoge", "n" : null }"""
+    src2 = """{ "f" : 43, "d": "2019/09/15 14:50:04.101 +0900", "s" : 42,     "n" : null }"""
+
+    clickhouse.data_string2type_value(src1, schema_cache=cache)
+    res = clickhouse.data_string2type_value(src2, schema_cache=cache)
+
+    expected = (
+        ("f", "d", "s", "n"),
+        ("Float64", "DateTime64(6)", "String", "String"),
+        [(43, datetime(2019, 9, 15, 14, 50, 4, 101000, timezone(timedelta(hours=9))), "42", None)]
+    )
+    assert expected == res
+    assert (1, 1, 0) == cache.cache_info()[0:3]
+
+
+def test_infer_again_if_values_do_not_fit_cached_schema():
+    from lakeweed.schema import SchemaCache
+    cache = SchemaCache()
+
+    src1 = """{ "f" : 42, "n" : null, "a" : [] }"""
+    src2 = """{ "f" : "hoge", "n" : true, "a" : [1] }"""
+
+    clickhouse.data_string2type_value(src1, schema_cache=cache)
+    res = clickhouse.data_string2type_value(src2, schema_cache=cache)
+
+    assert res == clickhouse.data_string2type_value(src2)
+    assert (1, 1, 1) == cache.cache_info()[0:3]
+
+
+def test_data_type2clickhouse_type():
+    assert "Float64" == clickhouse.data_type2clickhouse_type("Float")
+    assert "DateTime64(6)" == clickhouse.data_type2clickhouse_type("DateTime")
+    assert "String" == clickhouse.data_type2clickhouse_type(None)
+    assert "Array(DateTime64(6))" == clickhouse.data_type2clickhouse_type("Array(DateTime)")
+    assert "Array(String)" == clickhouse.data_type2clickhouse_type("Array(Empty)")
+
+
+# --------------------------------
+# Sampling Cases
+
+def test_infer_types_with_sampled_records():
+    src = """
+    { "f" : 42, "d": "2019/09/15 14:50:03.101 +0900", "n" : null }
+    { "f" : 43, "d": "2019/09/15 14:50:04.101 +0900", "n" : null }
+    { "f" : 44, "d": "2019/09/15 14:50:05.101 +0900", "n" : null }
+    { "f" : "hoge", "d": "2019/09/15 14:50:06.101 +0900", "n" : true }
+    """
+
+    res = clickhouse.data_string2type_value(src, sampling=2)
+    assert clickhouse.data_string2type_value(src) == res
+    assert ("String", "DateTime64(6)", "UInt8") == res[1]
+
+
+def test_infer_types_with_all_records_if_many_records_do_not_fit_sampled_types():
+    from lakeweed.sampling import Sampling
+
+    src = """
+    { "f" : 42 }
+    { "f" : "hoge" }
+    { "f" : "fuga" }
+    """
+
+    res = clickhouse.data_string2type_value(src, sampling=Sampling(1, max_reinference=1))
+    assert clickhouse.data_string2type_value(src) == res
+
+
+def test_cache_sampled_schema():
+    from lakeweed.schema import SchemaCache
+    cache = SchemaCache()
+
+    src = "\n".join([f'{{ "f" : {i}, "s" : "hoge" }}' for i in range(20)])
+    expected = clickhouse.data_string2type_value(src)
+    for _ in range(3):
+        assert expected == clickhouse.data_string2type_value(src, schema_cache=cache, sampling=10)
+
+    info = cache.cache_info()
+    assert (2, 1, 1) == (info.hits, info.misses, info.currsize)
+
+
+# --------------------------------
+# Parallel Cases
+
+def test_parallel_return_same_values_as_sequential_json_lines(monkeypatch):
+    src = "\n".join([
+        '{ "f" : 42, "d": "2019/09/15 14:50:03.101 +0900" }',
+        '{ "f" : 43, "d": null, "s" : "hoge" }',
+        '{ "f" : 44, "d": "2019/09/15 14:50:05.101 +0900" }',
+        '{ "f" : true, "d": "2019/09/15 14:50:06.101 +0900", "s" : 42 }',
+        '{ "f" : 46 }',
+    ])
+    specified_types = {"missing": "int"}
+
+    expected = clickhouse.data_string2type_value(src, specified_types=specified_types)
+
+    def fallback(*args, **kwargs):
+        raise AssertionError("converted without parallel")
+    monkeypatch.setattr(clickhouse, "data_string2type_value", fallback)
+
+    # The last chunk has a single record
+    for chunk_size in [1, 2]:
+        res = clickhouse.parallel_data_string2type_value(src, specified_types=specified_types, workers=2, chunk_size=chunk_size)
+        assert expected == res
+
+
+def test_parallel_return_columnar_values_csv():
+    from concurrent.futures import ThreadPoolExecutor
+
+    src = """
+    a,b
+    1,2019/09/15 14:50:03
+    2,
+    3,hoge
+    """
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        (columns, types, values) = clickhouse.parallel_data_string2type_value(src, columnar=True, chunk_size=1, executor=executor)
+
+    assert ("a", "b") == columns
+    assert ("Float64", "String") == types
+    assert [1.0, 2.0, 3.0] == values[0].tolist()
+    assert ["2019/09/15 14:50:03", None, "hoge"] == values[1].tolist()
+
+
+def test_return_same_values_by_csv_engines():
+    src = """
+    f,b,d,s,n
+    42,true,2019/09/15 14:50:03.101 +0900,"hello, world",
+    "42","false",2019/12/15 14:50:03.101 +0900,42,
+    """
+
+    expected = clickhouse.data_string2type_value(src, csv_engine="pandas")
+    res = clickhouse.data_string2type_value(src, csv_engine="stdlib")
+    assert expected == res
+
+    # UTF-8 BOM is not a part of the first column name
+    for bom_src in ['\ufeffa,b\n1,2', '\ufeffa,b\n1,2'.encode('utf-8')]:
+        expected = clickhouse.data_string2type_value(bom_src, csv_engine="pandas")
+        assert ("a", "b") == expected[0]
+        assert expected == clickhouse.data_string2type_value(bom_src, csv_engine="stdlib")
+
+
+def test_batch_return_union_columns_and_upcasted_types_of_messages():
+    src_list = [
+        '{"a": 1, "b": {"c": "2019/09/15 14:50:03"}}',
+        '{"a": ',
+        '{"b": {"c": "2019/09/16 14:50:03"}, "d": true}',
+        '{"a": 2}\n{"a": "hoge"}',
+    ]
+
+    (columns, types, values) = clickhouse.batch_data_string2type_value(src_list, specified_types={"e": "Int"})
+    assert ("a", "b__c", "d", "e") == columns
+    assert ("String", "DateTime64(6)", "UInt8", "Int64") == types
+    assert [
+        ("1", datetime(2019, 9, 15, 14, 50, 3, tzinfo=timezone.utc), None, None),
+        (None, datetime(2019, 9, 16, 14, 50, 3, tzinfo=timezone.utc), 1, None),
+        ("2", None, None, None),
+        ("hoge", None, None, None),
+    ] == values
+
+
+def test_batch_return_same_values_as_single_message():
+    src = '{"a": 1.5, "b": [1, 2], "c": "2019-09-15 14:50:03"}'
+    assert clickhouse.data_string2type_value(src) == clickhouse.batch_data_string2type_value([src], format="json")
+    assert ((), (), []) == clickhouse.batch_data_string2type_value([])
+
+
+def test_return_epoch_time_with_datetime_precision():
+    src = """
+    {"d": "2019-09-15 14:50:03.123456789+09:00", "ds": ["2019-09-15T05:50:03Z", "2019-09-15T05:50:04.5Z"], "s": "1970-01-01"}
+    {"d": "2019-09-15 14:50:04", "ds": [], "s": "hoge"}
+    """
+    d1 = int(datetime(2019, 9, 15, 5, 50, 3, tzinfo=timezone.utc).timestamp())
+    d2 = int(datetime(2019, 9, 15, 14, 50, 4, tzinfo=timezone.utc).timestamp())
+
+    (columns, types, values) = clickhouse.data_string2type_value(src, datetime_precision=9, specified_types={"s": "DateTime"})
+    assert ("d", "ds", "s") == columns
+    assert ("DateTime64(9)", "Array(DateTime64(9))", "DateTime64(9)") == types
+    assert [
+        (d1 * 10**9 + 123456789, [d1 * 10**9, (d1 + 1) * 10**9 + 500000000], 0),
+        (d2 * 10**9, [], None),
+    ] == values
+
+    (columns, types, values) = clickhouse.data_string2type_value(src, datetime_precision=3, tz_str="Asia/Tokyo")
+    assert ("DateTime64(3)", "Array(DateTime64(3))", "String") == types
+    assert d1 * 1000 + 123 == values[0][0]
+    assert (d2 - 9 * 3600) * 1000 == values[1][0]
+
+    (columns, types, values) = clickhouse.data_string2type_value(src, datetime_precision=0, columnar=True)
+    assert "int64" == values[0].dtype
+    assert [d1, d2] == values[0].tolist()
+
+    assert "Array(DateTime64(3))" == clickhouse.data_type2clickhouse_type("Array(DateTime)", datetime_precision=3)
+    with pytest.raises(ValueError):
+        clickhouse.data_string2type_value(src, datetime_precision=10)
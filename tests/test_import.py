@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+
+def loaded_modules(statement):
+    code = f"import sys; {statement}; print(' '.join(sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return set(out.split())
+
+
+def test_import_clickhouse_does_not_load_heavy_modules():
+    modules = loaded_modules("import lakeweed.clickhouse")
+    assert "lakeweed.clickhouse" in modules
+    for heavy in ["pandas", "numpy", "dateutil", "pytz", "multiprocessing"]:
+        assert heavy not in modules
+
+
+def test_convert_json_does_not_load_pandas():
+    modules = loaded_modules("from lakeweed import clickhouse; clickhouse.data_string2type_value('{\"a\": \"2019/09/15 14:50:03\"}')")
+    assert "dateutil" in modules
+    assert "pandas" not in modules
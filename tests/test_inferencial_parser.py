@@ -99,3 +99,169 @@ def test_inference_format_reteurn_csv_src_is_basic_csv():
     assert ip.Csv == format
     assert ["a", "b", "c", "d", "e"] == keys
     assert [[10, None, "hello,world", None, None], [42, 'hoge', 'hello,world', None, None]] == values_list
+
+
+# -------------- JsonLines (streaming) -------------- #
+def test_iter_json_lines_yield_batches_with_union_keys():
+    lines = [
+        '{ "a" : 1 }\n',
+        '\n',
+        '{ "b" : 2 }\n',
+        '{ "a" : 3, "c" : 4 }\n',
+    ]
+
+    batches = list(ip.iter_json_lines(lines, batch_size=2))
+    assert [
+        (['a', 'b'], [[1, None], [None, 2]]),
+        (['a', 'c'], [[3, 4]]),
+    ] == batches
+
+
+def test_iter_json_lines_skip_invalid_line():
+    lines = [b'{ "a" : 1 }', b'hello!', b'{ "a" : 2 }']
+
+    batches = list(ip.iter_json_lines(lines))
+    assert [(['a'], [[1], [2]])] == batches
+
+
+# -------------- Sniffing -------------- #
+def test_sniff_format():
+    assert ip.Invalid == ip.sniff_format("  \n ")
+    assert ip.Json == ip.sniff_format('\n  { "a" : 1 }\n')
+    assert ip.Json == ip.sniff_format('{\n  "a" : 1\n}')
+    assert ip.JsonLines == ip.sniff_format('\n{ "a" : 1 }\n{ "a" : 2 }\n')
+    assert ip.Csv == ip.sniff_format('\na,b\n1,2\n')
+
+
+def test_inference_format_with_format_hint():
+    src = """
+    a,b
+    1,2
+    """
+
+    (format, keys, values_list) = ip.inferencial_parse(src, format=ip.Csv)
+    assert ip.Csv == format
+    assert ["a", "b"] == keys
+    assert [[1, 2]] == values_list
+
+    (format, keys, values_list) = ip.inferencial_parse(src, format=ip.Json)
+    assert ip.Invalid == format
+    assert [] == keys
+    assert [] == values_list
+
+
+def test_inference_single_record_json_lines_with_format_hint():
+    src = '{"a": 1}\n'
+
+    (format, keys, values_list) = ip.inferencial_parse(src, format=ip.JsonLines)
+    assert ip.JsonLines == format
+    assert ["a"] == keys
+    assert [[1]] == values_list
+
+    # Without hint, it's Json
+    assert ip.Json == ip.inferencial_parse(src)[0]
+    assert ip.Invalid == ip.inferencial_parse("\n", format=ip.JsonLines)[0]
+
+
+# -------------- Chunks -------------- #
+def test_split_chunks_json_lines():
+    src = """
+    { "a" : 1 }
+    { "a" : 2 }
+
+    { "a" : 3 }
+    """
+    chunks = ip.split_chunks(src, ip.JsonLines, 2)
+    assert ['{ "a" : 1 }\n    { "a" : 2 }', '    { "a" : 3 }'] == chunks
+
+    # Escaped quotes are not quoted fields of CSV
+    src = '{ "a" : "5\\" screen" }\n{ "a" : 2 }\n\n{ "a" : 3 }'
+    chunks = ip.split_chunks(src, ip.JsonLines, 1)
+    assert ['{ "a" : "5\\" screen" }', '{ "a" : 2 }', '{ "a" : 3 }'] == chunks
+
+
+def test_split_chunks_csv_with_header_and_quoted_lines():
+    src = 'a,b\n1,"hello\nworld"\n2,3\n4,5\n'
+    chunks = ip.split_chunks(src, ip.Csv, 2)
+    assert ['a,b\n1,"hello\nworld"\n2,3', 'a,b\n4,5'] == chunks
+
+
+# -------------- CSV (stdlib engine) -------------- #
+def test_inference_format_reteurn_csv_src_is_basic_csv_by_stdlib():
+    src = """
+    a,b,c,d,e
+    10,,"hello,world",,
+    42,hoge,"hello,world",,
+    """
+
+    (format, keys, values_list) = ip.inferencial_parse(src, csv_engine=ip.CsvEngineStdlib)
+    assert ip.Csv == format
+    assert ["a", "b", "c", "d", "e"] == keys
+    assert [[10, None, "hello,world", None, None], [42, 'hoge', 'hello,world', None, None]] == values_list
+
+
+def test_csv_stdlib_engine_infer_column_types_like_pandas():
+    src = """
+    a,a,,i,f,b,s
+    1,"2",NA,42,1.5,true,1
+    2,3,,,2,FALSE,hoge
+    """
+
+    (format, keys, values_list) = ip.inferencial_parse(src, csv_engine=ip.CsvEngineStdlib)
+    assert ip.Csv == format
+    assert ["a", "a.1", "Unnamed: 2", "i", "f", "b", "s"] == keys
+    assert [[1, 2, None, 42.0, 1.5, True, "1"], [2, 3, None, None, 2.0, False, "hoge"]] == values_list
+    assert float == type(values_list[0][3])
+
+
+def test_csv_stdlib_engine_reject_row_has_too_many_fields():
+    src = """
+    a,b
+    1,2,3
+    """
+
+    (format, keys, values_list) = ip.inferencial_parse(src, format=ip.Csv, csv_engine=ip.CsvEngineStdlib)
+    assert ip.Invalid == format
+
+
+def test_inference_format_accept_bytes_like_src():
+    src = '{"a": 1, "s": "ほげ"}\n{"a": 2, "b": [1, 2]}\n'
+
+    for buffer in [src.encode(), bytearray(src.encode()), memoryview(src.encode())]:
+        (format, keys, values_list) = ip.inferencial_parse(buffer)
+        assert ip.JsonLines == format
+        assert ["a", "s", "b"] == keys
+        assert [[1, "ほげ", None], [2, None, [1, 2]]] == values_list
+
+    (format, keys, values_list) = ip.inferencial_parse(b'{"a": {"b": 1}}')
+    assert ip.Json == format
+    assert ["a__b"] == keys
+    assert [[1]] == values_list
+
+    (format, keys, values_list) = ip.inferencial_parse(b'\xff\xfe')
+    assert ip.Invalid == format
+
+
+def test_inference_format_accept_mmap_src():
+    import mmap
+    import tempfile
+
+    src = "a,b\n1,ほげ\n2,\n"
+    with tempfile.TemporaryFile() as f:
+        f.write(src.encode())
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for engine in [ip.CsvEnginePandas, ip.CsvEngineStdlib]:
+                (format, keys, values_list) = ip.inferencial_parse(m, csv_engine=engine)
+                assert ip.Csv == format
+                assert ["a", "b"] == keys
+                assert [[1, "ほげ"], [2, None]] == values_list
+
+
+def test_inference_format_json_lines_write_values_to_union_columns():
+    src = '{"a": 1}\n{"b": 2, "a": 3}\n{"c": {"d": 4}}\n{}'
+
+    (format, keys, values_list) = ip.inferencial_parse(src)
+    assert ip.JsonLines == format
+    assert ["a", "b", "c__d"] == keys
+    assert [[1, None, None], [3, 2, None], [None, None, 4], [None, None, None]] == values_list
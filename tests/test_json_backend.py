@@ -0,0 +1,56 @@
+import pytest
+
+from lakeweed import clickhouse, json_backend
+
+
+@pytest.fixture
+def restore_backend():
+    backend = json_backend.get_backend()
+    yield
+    json_backend.set_backend(backend)
+
+
+SOURCES = [
+    '{"i": 42, "f": 42.0, "e": 1e2, "n": -0.0, "b": true, "z": null, "s": "\\u3042", "a": [1, 2.5, {"x": "y"}]}',
+    '{"big": 123456789012345678901234567890, "nan": NaN, "inf": -Infinity}',
+    '{"min": -9223372036854775809, "neg": -9999999999999999999}',
+    '{"surrogate": "\\ud800"}',
+]
+
+
+@pytest.mark.parametrize("src", SOURCES)
+def test_orjson_backend_return_same_values_as_stdlib(src, restore_backend):
+    pytest.importorskip("orjson")
+
+    json_backend.set_backend(json_backend.Stdlib)
+    expected = json_backend.loads(src)
+    expected_converted = clickhouse.data_string2type_value(src)
+
+    json_backend.set_backend(json_backend.Orjson)
+    res = json_backend.loads(src)
+    res_converted = clickhouse.data_string2type_value(src)
+
+    assert repr(expected) == repr(res)
+    assert repr(expected_converted) == repr(res_converted)
+    assert repr(expected) == repr(json_backend.loads(src.encode()))
+
+
+def test_invalid_json_raise_JSONDecodeError_for_all_backends(restore_backend):
+    import json
+    for name in [json_backend.Stdlib, json_backend.Auto]:
+        json_backend.set_backend(name)
+        with pytest.raises(json.JSONDecodeError):
+            json_backend.loads('{"a": }')
+
+
+def test_set_custom_backend(restore_backend):
+    import json
+    json_backend.set_backend(json_backend.JsonBackend("custom", json.loads, lambda v: "dumped"))
+
+    (columns, types, values) = clickhouse.data_string2type_value('{"a": {}}')
+    assert [("dumped", )] == values
+
+
+def test_set_unknown_backend():
+    with pytest.raises(ValueError):
+        json_backend.set_backend("hoge")
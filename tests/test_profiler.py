@@ -0,0 +1,49 @@
+from lakeweed import clickhouse, time_parser
+from lakeweed.profiler import ColumnProfiler
+
+
+def test_column_profiler_count_costs_of_each_column():
+    src = """
+    {"d": "2019-09-15 14:50:03", "s": "12-34 apples", "t": "hello", "f": 1, "n": "abc"}
+    {"d": "2019/09/15 14:50:03", "s": "56-78 oranges", "t": "world", "f": 2, "n": "42"}
+    """
+    profiler = ColumnProfiler()
+    expected = clickhouse.data_string2type_value(src, specified_types={"n": "Int"})
+    time_parser.clear_parse_cache()  # Count dateutil calls again
+    assert expected == clickhouse.data_string2type_value(src, specified_types={"n": "Int"}, profiler=profiler)
+
+    profiles = profiler.profiles
+    assert ["d", "s", "t", "f", "n"] == list(profiles.keys())
+    assert 2 == profiles["d"].values
+    # The second value does not match the learned layout
+    assert (2, 0) == (profiles["d"].dateutil_calls, profiles["d"].time_parse_exceptions)
+    # Looks like datetime, so dateutil is called and raise exceptions
+    assert (2, 2) == (profiles["s"].dateutil_calls, profiles["s"].time_parse_exceptions)
+    # Does not look like datetime, so dateutil is not called
+    assert (0, 2) == (profiles["t"].dateutil_calls, profiles["t"].time_parse_exceptions)
+    assert (0, 0) == (profiles["f"].dateutil_calls, profiles["f"].time_parse_exceptions)
+    assert 1 == profiles["n"].conversion_failures
+    assert all(p.inference_seconds > 0 and p.conversion_seconds > 0 for p in profiles.values())
+
+
+def test_column_profiler_report_ranked_columns():
+    profiler = ColumnProfiler()
+    profiler.profile("a").inference_seconds = 1.0
+    profiler.profile("b").conversion_seconds = 3.0
+    profiler.profile("c").inference_seconds = 2.0
+
+    assert ["b", "c", "a"] == [p.column for p in profiler.report()]
+    assert ["b"] == [p.column for p in profiler.report(top=1)]
+
+    profiler.clear()
+    assert [] == profiler.report()
+
+
+def test_column_profiler_accumulate_over_batches_in_columnar():
+    profiler = ColumnProfiler()
+    lines = ['{"a": "x"}', '{"a": "y"}', '{"a": "z"}']
+    for _ in clickhouse.iter_data_lines2type_value(lines, batch_size=2, columnar=True, profiler=profiler):
+        pass
+
+    assert 3 == profiler.profiles["a"].values
+    assert 3 == profiler.profiles["a"].time_parse_exceptions
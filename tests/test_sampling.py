@@ -0,0 +1,31 @@
+import pytest
+
+from lakeweed import sampling
+from lakeweed.sampling import Sampling
+
+
+def test_sampling_head():
+    assert [0, 1, 2] == Sampling(3).indices(10)
+
+
+def test_sampling_all_if_records_are_few():
+    assert [0, 1] == Sampling(3, sampling.Random).indices(2)
+
+
+def test_sampling_random():
+    indices = Sampling(3, sampling.Random, seed=42).indices(10)
+    assert 3 == len(set(indices))
+    assert sorted(indices) == indices
+    assert all(0 <= i < 10 for i in indices)
+
+
+def test_sampling_stratified_pick_a_record_in_each_range():
+    indices = Sampling(3, sampling.Stratified, seed=42).indices(9)
+    assert 0 <= indices[0] < 3
+    assert 3 <= indices[1] < 6
+    assert 6 <= indices[2] < 9
+
+
+def test_sampling_invalid_method():
+    with pytest.raises(ValueError):
+        Sampling(3, "hoge")
@@ -0,0 +1,85 @@
+import pytest
+from collections import OrderedDict
+
+from lakeweed.schema import SchemaCache, SchemaTracker, SchemaChange
+
+
+def test_schema_cache_count_hits_and_misses():
+    cache = SchemaCache(maxsize=2)
+    key = cache.fingerprint(["a", "b"], {"b": "int"})
+
+    assert cache.get(key) is None
+    cache.put(key, "schema")
+    assert "schema" == cache.get(key)
+
+    info = cache.cache_info()
+    assert (1, 1, 0, 2, 1) == (info.hits, info.misses, info.mismatches, info.maxsize, info.currsize)
+
+
+def test_schema_cache_fingerprint_depends_on_specified_types():
+    assert SchemaCache.fingerprint(["a"], {}) != SchemaCache.fingerprint(["a"], {"a": "int"})
+    assert SchemaCache.fingerprint(["a"], {"a": "int", "b": "str"}) == SchemaCache.fingerprint(["a"], {"b": "str", "a": "int"})
+
+
+def test_schema_cache_evict_least_recently_used():
+    cache = SchemaCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert 1 == cache.get("a")
+    assert cache.get("b") is None
+    assert 3 == cache.get("c")
+
+
+def test_schema_cache_mismatch_remove_schema():
+    cache = SchemaCache()
+    cache.put("a", 1)
+    cache.mismatch("a")
+
+    assert cache.get("a") is None
+    assert 1 == cache.cache_info().mismatches
+
+
+def test_schema_cache_maxsize_must_be_positive():
+    with pytest.raises(ValueError):
+        SchemaCache(maxsize=0)
+
+
+# --------------------------------
+# SchemaTracker
+
+def test_schema_tracker_report_new_columns_and_widened_types():
+    tracker = SchemaTracker()
+
+    changes = tracker.update("""
+    { "f" : 42, "b" : true, "n" : null, "a" : [] }
+    """)
+    assert [SchemaChange("f", None, "Float"), SchemaChange("b", None, "Bool")] == changes
+
+    changes = tracker.update("""
+    { "f" : 43, "b" : 1.5, "n" : "2019/09/15 14:50:03", "a" : [true], "s" : "hoge" }
+    """)
+    assert [
+        SchemaChange("b", "Bool", "Float"),
+        SchemaChange("n", None, "DateTime"),
+        SchemaChange("a", None, "Array(Bool)"),
+        SchemaChange("s", None, "String"),
+    ] == changes
+
+    changes = tracker.update("""
+    { "f" : 44, "b" : 2.5, "n" : null }
+    """)
+    assert [] == changes
+
+    assert OrderedDict([
+        ("f", "Float"), ("b", "Float"), ("n", "DateTime"), ("a", "Array(Bool)"), ("s", "String")
+    ]) == tracker.column_types
+
+
+def test_schema_tracker_use_specified_types():
+    tracker = SchemaTracker(specified_types={"f": "int"})
+
+    assert [SchemaChange("f", None, "Int")] == tracker.update('{ "f" : 42 }')
+    assert [] == tracker.update('{ "f" : "hoge" }')
@@ -0,0 +1,50 @@
+from lakeweed import clickhouse
+from lakeweed import inferencial_parser as ip
+from lakeweed.schema import SchemaCache
+from lakeweed.stats import PipelineStats, StageRecord
+
+
+def test_pipeline_stats_record_each_stage():
+    src = """
+    a,b,c
+    1,2019-09-15 14:50:03,hoge
+    2,,
+    """
+    stats = PipelineStats()
+    clickhouse.data_string2type_value(src, specified_types={"c": "Int", "d": "String"}, stats=stats)
+
+    stages = [r.stage for r in stats.records]
+    assert ["detect:csv", "1:data_types", "2:upcast", "3:specified_types", "4:unknown_types", "5:conversion"] == stages
+
+    records = {r.stage: r for r in stats.records}
+    assert (2, 3) == (records["detect:csv"].rows, records["detect:csv"].columns)
+    assert (2, 3) == (records["1:data_types"].rows, records["1:data_types"].columns)
+    assert (0, 4) == (records["4:unknown_types"].rows, records["4:unknown_types"].columns)
+    assert (2, 4) == (records["5:conversion"].rows, records["5:conversion"].columns)
+    assert all(r.seconds >= 0 for r in stats.records)
+    assert list(stats.totals().keys()) == stages
+
+
+def test_pipeline_stats_record_failed_detection_attempts():
+    src = '{"a": 1}\n{"a": 2'
+    stats = PipelineStats()
+    (format, keys, values_list) = ip.inferencial_parse(src, stats=stats)
+
+    assert ip.Csv == format
+    assert ["detect:json_lines", "detect:json", "detect:csv"] == [r.stage for r in stats.records]
+    assert [(0, 0), (0, 0), (1, 1)] == [(r.rows, r.columns) for r in stats.records]
+
+
+def test_pipeline_stats_call_callback_and_record_schema_cache():
+    received = []
+    stats = PipelineStats(callback=received.append)
+    cache = SchemaCache()
+
+    clickhouse.data_string2type_value('{"a": 1}', schema_cache=cache, stats=stats)
+    stats.clear()
+    clickhouse.data_string2type_value('{"a": 2}', schema_cache=cache, stats=stats)
+
+    assert ["detect:json", "schema_cache", "5:conversion"] == [r.stage for r in stats.records]
+    assert StageRecord("schema_cache", stats.records[1].seconds, 1, 1) == stats.records[1]
+    assert 10 == len(received)
+    assert stats.records == received[-3:]
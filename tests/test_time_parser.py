@@ -153,5 +153,99 @@ def test_return_original_string_is_simple_day_of_week():
     assertNotValid("Sat")
 
 
+# --------------------------------------------------------------------------
+def test_column_time_parser_learn_layout_from_first_value():
+    parser = time_parser.ColumnTimeParser()
+    first = parser.parse("2019/09/15 14:50:03.101 +0900")
+    assert parser.layout is not None
+
+    for src in ["2019/09/15 14:50:03.101 +0900", "2019/9/5 4:05:06.123456789 -0330", "2019/09/15 14:50:03.202"]:
+        expected = time_parser.elastic_time_parse(src, tz_str="Asia/Tokyo")
+        actual = parser.parse(src, tz_str="Asia/Tokyo")
+        assert expected.tupple() == actual.tupple()
+        assert expected.datetime.utcoffset() == actual.datetime.utcoffset()
+        assert src == str(actual)
+
+    assert first.tupple() == (datetime(2019, 9, 15, 14, 50, 3, 101000, timezone(timedelta(hours=9))), 101000000)
+
+
+def test_column_time_parser_fallback_if_value_does_not_match_layout():
+    parser = time_parser.ColumnTimeParser()
+    parser.parse("2018-12-03T12:34:56+08:00")
+
+    actual = parser.parse("Sun, 31 Aug 2008 12:34:56.789123456 GMT")
+    assert (datetime(2008, 8, 31, 12, 34, 56, 789123, timezone(timedelta(hours=0))), 789123456) == actual.tupple()
+
+    with pytest.raises(ValueError):
+        parser.parse("2018-13-03T12:34:56+08:00")
+
+
+def test_column_time_parser_does_not_learn_unsupported_layout():
+    parser = time_parser.ColumnTimeParser()
+    parser.parse("Sun, 31 Aug 2008 12:34:56 GMT")
+    assert parser.layout is None
+
+
+def test_elastic_time_parse_cache_datetimes_and_non_datetimes():
+    time_parser.set_parse_cache(2)
+    try:
+        first = time_parser.elastic_time_parse("2019-09-15 14:50:03", tz_str="Asia/Tokyo")
+        assert first is time_parser.elastic_time_parse("2019-09-15 14:50:03", tz_str="Asia/Tokyo")
+        assert first.datetime != time_parser.elastic_time_parse("2019-09-15 14:50:03").datetime  # tz_str is a part of key
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                time_parser.elastic_time_parse("12-34 apples")
+        with pytest.raises(ValueError):
+            time_parser.elastic_time_parse("hello")  # rejected without dateutil, so not cached
+
+        info = time_parser.parse_cache_info()
+        assert (2, 3, 2, 2) == (info.hits, info.misses, info.maxsize, info.currsize)
+
+        time_parser.clear_parse_cache()
+        assert 0 == time_parser.parse_cache_info().currsize
+
+        time_parser.set_parse_cache(None)
+        assert time_parser.parse_cache_info() is None
+        assert datetime(2019, 9, 15, 14, 50, 3, tzinfo=timezone.utc) == time_parser.elastic_time_parse("2019-09-15 14:50:03").datetime
+    finally:
+        time_parser.set_parse_cache()
+
+
+def test_datetime_with_ns_has_no_dict():
+    parsed = time_parser.elastic_time_parse("2019-09-15 14:50:03.123456789")
+    assert not hasattr(parsed, "__dict__")
+    assert DateTimeWithNS(parsed.datetime, 123456789, "2019-09-15 14:50:03.123456789") == parsed
+
+
+def test_does_not_keep_original_string():
+    parser = time_parser.ColumnTimeParser(keep_original_string=False)
+    for src in ["2019-09-15 14:50:03", "2019-09-16 14:50:03"]:  # The second is parsed by learned layout.
+        parsed = parser.parse(src)
+        assert parsed.original_string is None
+        assert parsed.datetime.isoformat() == str(parsed)
+
+    # Other parsers and cached values keep it
+    assert "2019-09-15 14:50:03" == str(time_parser.ColumnTimeParser().parse("2019-09-15 14:50:03"))
+    assert "2019-09-15 14:50:03" == str(time_parser.elastic_time_parse("2019-09-15 14:50:03"))
+
+
+def test_parse_epoch_by_learned_layout_same_as_datetime():
+    parser = time_parser.ColumnTimeParser()
+    first = parser.parse("1969-12-31 23:59:59.5 -0130")
+    assert parser.layout is not None
+
+    for src in ["1969-12-31 23:59:59.5 -0130", "2000-02-29 00:00:00.123456789 +0900", "2019-09-15 14:50:03.1Z"]:
+        for precision in [0, 6, 9]:
+            epoch = parser.layout.parse_epoch(src, precision=precision)
+            assert time_parser.to_epoch(parser.parse(src), precision) == epoch
+    assert -1 * 10**9 + 500000000 + 5400 * 10**9 == time_parser.to_epoch(first)
+
+    # Invalid date in the layout is parsed by dateutil, and raise exception
+    assert parser.layout.parse_epoch("2019-02-29 00:00:00.0 Z") is None
+    with pytest.raises(ValueError):
+        parser.parse_epoch("2019-02-29 00:00:00.0 Z")
+
+
 if __name__ == '__main__':
     pytest.main(['-v', __file__])
@@ -72,6 +72,31 @@ def test_flatten_array():
     assert expected == res
 
 
+def test_flatten_keep_order_of_nested_keys():
+    src = {"a": {"b": {"c": 1, "d": {}}, "e": 2}, "f": 3, "g": {"h": 4}}
+    res = util.flatten(src, delimiter="__")
+    assert [("a__b__c", 1), ("a__b__d", {}), ("a__e", 2), ("f", 3), ("g__h", 4)] == list(res.items())
+
+
+def test_flatten_deeper_than_recursion_limit():
+    import sys
+    src = nested = {}
+    for _ in range(sys.getrecursionlimit() + 100):
+        nested["k"] = {}
+        nested = nested["k"]
+    nested["v"] = 42
+
+    res = util.flatten(src, delimiter="_")
+    assert [42] == list(res.values())
+    assert "k_" * (sys.getrecursionlimit() + 100) + "v" == list(res.keys())[0]
+
+
+def test_flatten_share_key_objects_between_records():
+    keys1 = list(util.flatten({"a": {"b": 1}, "c": 2}, delimiter="__").keys())
+    keys2 = list(util.flatten({"a": {"b": 3}, "c": 4}, delimiter="__").keys())
+    assert all(k1 is k2 for k1, k2 in zip(keys1, keys2))
+
+
 def test_basic_data_types():
     src = [
         42,
@@ -99,3 +124,33 @@ def test_basic_data_types():
     ]
     res = util.data_types(src)
     assert expected == res
+
+
+def test_data_types_store_parsed_datetimes():
+    src = [42, "2020-08-09 11:04:00", "Hello, LakeWeed", ["2020-08-09 11:04:00"]]
+    parsed = {}
+
+    res = util.data_types(src, tz_str="Asia/Tokyo", parsed_datetimes=parsed)
+    assert ["Float", "DateTime", "String", "Array(DateTime)"] == res
+    assert [1] == list(parsed.keys())
+    assert (datetime(2020, 8, 9, 11, 4, 0, 0, timezone(timedelta(hours=9))), 0) == parsed[1].tupple()
+
+
+def test_upcast_data_type_is_commutative_and_associative():
+    import itertools
+    types = [None, 'Float', 'Bool', 'DateTime', 'String', 'Array(Empty)', 'Array(None)', 'Array(Float)', 'Array(Bool)',
+             'Array(String)', 'Array(Array(Float))']
+    up = util.upcast_data_type
+    for t1, t2 in itertools.product(types, types):
+        assert up(t1, t2) == up(t2, t1)
+    for t1, t2, t3 in itertools.product(types, types, types):
+        assert up(up(t1, t2), t3) == up(t1, up(t2, t3))
+
+
+def test_upcast_data_types_with_types_not_seen_before():
+    types_list = [
+        ['Array(Array(Bool))', 'Array(Empty)', None],
+        ['Array(Array(Bool))', 'Array(Array(Float))', None],
+    ]
+    assert ['Array(Array(Bool))', 'Array(Array(Float))', None] == util.upcast_data_types(types_list)
+    assert 'Array(String)' == util.upcast_data_type('Array(Array(Bool))', 'Array(Float)')